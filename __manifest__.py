@@ -31,12 +31,14 @@
         'views/badminton_product_views.xml',
         'views/badminton_product_sale_views.xml',
         'views/badminton_lesson_payment_views.xml',
+        'views/badminton_lesson_billing_wizard_views.xml',
         'views/customer_wizard_views.xml',
         'views/qr_scanner_views.xml',
         'views/session_extend_wizard_views.xml',
         'views/badminton_attendance_check_views.xml',
         'views/menu_views.xml',
         'views/cash_views.xml',
+        'views/cash_closing_views.xml',
         'reports/badminton_payment_receipt.xml',
     ],
     'assets': {
@@ -1 +1 @@
-from . import qr_routes
\ No newline at end of file
+from . import cash_export
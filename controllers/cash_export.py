@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+import csv
+import io
+import tempfile
+
+import xlsxwriter
+from werkzeug.wsgi import wrap_file
+
+from odoo import http, fields
+from odoo.exceptions import AccessError
+from odoo.http import request, Response, content_disposition
+
+# Bir sorğuda oxunan sətir sayı (yaddaş sabit qalsın deyə)
+EXPORT_CHUNK_SIZE = 2000
+
+EXPORT_HEADERS = ['Mənbə', 'Tarix', 'Sənəd', 'Müştəri', 'Kateqoriya', 'Ödəniş Metodu', 'Məbləğ']
+
+# Hər mənbə üçün (model, başlıq, sorğu). Sorğular (gün, id) üzrə keyset ilə səhifələnir.
+EXPORT_SOURCES = [
+    ('volan.cash.flow.genclik', 'Kassa Əməliyyatı', """
+        SELECT f.id, f.date AS day, f.name, p.name, f.category, NULL,
+               CASE WHEN f.transaction_type = 'expense' THEN -f.amount ELSE f.amount END
+          FROM volan_cash_flow_genclik f
+          LEFT JOIN res_partner p ON p.id = f.partner_id
+         WHERE f.date BETWEEN %(date_from)s AND %(date_to)s
+           AND (f.date, f.id) > (%(last_day)s, %(last_id)s)
+      ORDER BY f.date, f.id
+         LIMIT %(limit)s
+    """),
+    ('badminton.lesson.payment.genclik', 'Abunəlik Ödənişi', """
+        SELECT pay.id, LEAST(pay.payment_date, pay.real_date) AS day, l.name, p.name,
+               'lesson', pay.payment_method_lesson, pay.amount
+          FROM badminton_lesson_payment_genclik pay
+          LEFT JOIN badminton_lesson_simple_genclik l ON l.id = pay.lesson_id
+          LEFT JOIN res_partner p ON p.id = pay.partner_id
+         WHERE LEAST(pay.payment_date, pay.real_date) BETWEEN %(date_from)s AND %(date_to)s
+           AND (LEAST(pay.payment_date, pay.real_date), pay.id) > (%(last_day)s, %(last_id)s)
+      ORDER BY LEAST(pay.payment_date, pay.real_date), pay.id
+         LIMIT %(limit)s
+    """),
+    ('badminton.sale.genclik', 'Satış', """
+        SELECT s.id, s.payment_date::date AS day, s.name, p.name,
+               'sale', s.payment_method, s.amount_paid
+          FROM badminton_sale_genclik s
+          LEFT JOIN res_partner p ON p.id = s.partner_id
+         WHERE s.state = 'paid'
+           AND s.payment_date::date BETWEEN %(date_from)s AND %(date_to)s
+           AND (s.payment_date::date, s.id) > (%(last_day)s, %(last_id)s)
+      ORDER BY s.payment_date::date, s.id
+         LIMIT %(limit)s
+    """),
+]
+
+
+class CashLedgerExport(http.Controller):
+
+    def _iter_rows(self, date_from, date_to):
+        """Bütün mənbələrin sətirlərini hissə-hissə oxu (heç vaxt hamısını yaddaşa yığmır)"""
+        cr = request.env.cr
+        for model_name, label, query in EXPORT_SOURCES:
+            request.env[model_name].flush_model()
+            last_day, last_id = date_from, 0
+            while True:
+                cr.execute(query, {
+                    'date_from': date_from,
+                    'date_to': date_to,
+                    'last_day': last_day,
+                    'last_id': last_id,
+                    'limit': EXPORT_CHUNK_SIZE,
+                })
+                rows = cr.fetchall()
+                if not rows:
+                    break
+                for record_id, day, name, partner, category, payment_method, amount in rows:
+                    yield [label, day, name or '', partner or '', category or '', payment_method or '', amount or 0.0]
+                last_id, last_day = rows[-1][0], rows[-1][1]
+                if len(rows) < EXPORT_CHUNK_SIZE:
+                    break
+
+    def _write_csv(self, stream, rows):
+        writer_stream = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+        writer = csv.writer(writer_stream)
+        writer.writerow(EXPORT_HEADERS)
+        for row in rows:
+            row[1] = fields.Date.to_string(row[1])
+            writer.writerow(row)
+        writer_stream.flush()
+        writer_stream.detach()
+
+    def _write_xlsx(self, stream, rows):
+        # constant_memory: sətirlər yazıldıqca diskə atılır
+        workbook = xlsxwriter.Workbook(stream, {'constant_memory': True})
+        sheet = workbook.add_worksheet('Kassa')
+        date_format = workbook.add_format({'num_format': 'yyyy-mm-dd'})
+        money_format = workbook.add_format({'num_format': '#,##0.00'})
+        sheet.write_row(0, 0, EXPORT_HEADERS)
+        for index, row in enumerate(rows, start=1):
+            sheet.write_string(index, 0, row[0])
+            sheet.write_datetime(index, 1, fields.Datetime.to_datetime(row[1]), date_format)
+            sheet.write_row(index, 2, row[2:6])
+            sheet.write_number(index, 6, row[6], money_format)
+        workbook.close()
+
+    @http.route('/volan_genclikk/cash/export', type='http', auth='user')
+    def export_cash_ledger(self, date_from, date_to, file_format='csv', **kwargs):
+        # Sətirlər birbaşa SQL ilə oxunur (record rule-lar tətbiq olunmur) - yalnız admin
+        if not request.env.user.has_group('volan_genclikk.group_genclik_admin'):
+            raise AccessError('Kassa ixracı yalnız adminlər üçündür!')
+        for model_name, _label, _query in EXPORT_SOURCES:
+            request.env[model_name].check_access_rights('read')
+
+        date_from = fields.Date.to_date(date_from)
+        date_to = fields.Date.to_date(date_to)
+        if file_format not in ('csv', 'xlsx') or not date_from or not date_to:
+            return request.not_found()
+
+        stream = tempfile.TemporaryFile()
+        rows = self._iter_rows(date_from, date_to)
+        if file_format == 'xlsx':
+            self._write_xlsx(stream, rows)
+            mimetype = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+        else:
+            self._write_csv(stream, rows)
+            mimetype = 'text/csv'
+        size = stream.tell()
+        stream.seek(0)
+
+        filename = f"kassa_{date_from}_{date_to}.{file_format}"
+        return Response(
+            wrap_file(request.httprequest.environ, stream),
+            headers=[
+                ('Content-Type', mimetype),
+                ('Content-Length', size),
+                ('Content-Disposition', content_disposition(filename)),
+            ],
+            direct_passthrough=True,
+        )
@@ -1,5 +1,6 @@
 from . import res_partner
 from . import badminton_session
+from . import badminton_court_occupancy
 from . import badminton_sale
 from . import badminton_sale_name_migration
 from . import badminton_group
@@ -10,12 +11,16 @@ from . import badminton_lesson_payment
 from . import badminton_lesson_substitute
 from . import badminton_monthly_balance
 from . import badminton_lesson_simple
+from . import badminton_lesson_billing_wizard
 from . import customer_wizards
 from . import qr_scanner
 from . import sport_system
 from . import session_extend_wizard
 from . import badminton_attendance_check
 from . import cash
+from . import cash_ledger_snapshot
+from . import cash_revenue_cube
+from . import cash_closing
 from . import badminton_session_filter
 from . import badminton_product
 from . import badminton_product_sale
@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+from odoo import models, fields, api
+
+# Bu modulun sessiyaları yalnız Gənclik filialına aiddir
+DEFAULT_BRANCH = 'genclik'
+
+
+class BadmintonCourtOccupancy(models.Model):
+    """Filial üzrə sessiya qəbulu kilidi.
+
+    Hər filial üçün bir sətir saxlanılır. Yalnız sessiya qəbulu (kapasitet
+    yoxlaması və növbədən avtomatik qəbul) bu sətri yeniləyir və aktiv
+    sessiyaları kilid altında sayır. Eyni anda iki qəbul birincinin nəticəsini
+    gözləyir (və ya serializasiya xətası ilə yenidən cəhd edilir), digər
+    vəziyyət dəyişiklikləri isə sətrə toxunmur.
+    """
+    _name = 'badminton.court.occupancy.genclik'
+    _description = 'Zal Doluluğu'
+    _rec_name = 'branch'
+    _sql_constraints = [
+        ('branch_unique', 'UNIQUE(branch)', 'Hər filial üçün yalnız bir doluluq sətri ola bilər!')
+    ]
+
+    branch = fields.Selection([
+        ('genclik', 'Gənclik'),
+        ('yasamal', 'Yasamal')
+    ], string="Filial", required=True, default=DEFAULT_BRANCH)
+
+    def init(self):
+        self._ensure_branch(DEFAULT_BRANCH)
+
+    @api.model
+    def _ensure_branch(self, branch):
+        self.env.cr.execute("""
+            INSERT INTO badminton_court_occupancy_genclik
+                   (branch, create_uid, create_date, write_uid, write_date)
+            VALUES (%(branch)s, %(uid)s, NOW() AT TIME ZONE 'UTC', %(uid)s, NOW() AT TIME ZONE 'UTC')
+            ON CONFLICT (branch) DO NOTHING
+        """, {'branch': branch, 'uid': self.env.uid})
+
+    @api.model
+    def _lock_branch(self, branch=DEFAULT_BRANCH):
+        """Qəbul üçün: filial sətrini yenilə və kilidlə, sonra aktiv sessiyaları say.
+
+        Sətir sadəcə kilidlənmir, yenilənir: gözləyən qəbul birincisi commit
+        olunandan sonra köhnə snapshot-la saymaq əvəzinə serializasiya xətası
+        alır və yeni snapshot-la yenidən cəhd edilir.
+        """
+        self.env.cr.execute("""
+            UPDATE badminton_court_occupancy_genclik
+               SET write_uid = %s, write_date = NOW() AT TIME ZONE 'UTC'
+             WHERE branch = %s
+        """, (self.env.uid, branch))
+        if not self.env.cr.rowcount:
+            self._ensure_branch(branch)
+            return self._lock_branch(branch)
+        self.invalidate_model(['write_uid', 'write_date'])
+        return self._get_active_count(branch)
+
+    @api.model
+    def _get_active_count(self, branch=DEFAULT_BRANCH):
+        """Aktiv/uzadılmış sessiyaların sayı (partial indekslə)"""
+        return self.env['badminton.session.genclik'].search_count([('state', 'in', ['active', 'extended'])])
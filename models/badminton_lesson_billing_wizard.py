@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+from odoo import models, fields, api
+from odoo.exceptions import ValidationError
+from dateutil.relativedelta import relativedelta
+
+
+class BadmintonLessonBillingWizard(models.TransientModel):
+    """Aylıq toplu ödəniş: seçilmiş aktiv abunəliklər üçün ayın ödənişlərini
+    bir dəfəyə yaradır. Həmin ay üçün artıq ödənişi olan abunəliklər atlanır,
+    buna görə sehrbazı təkrar işlətmək ikiqat ödəniş yaratmır.
+    """
+    _name = 'badminton.lesson.billing.wizard.genclik'
+    _description = 'Aylıq Toplu Ödəniş Sehrbazı'
+
+    state = fields.Selection([
+        ('select', 'Seçim'),
+        ('preview', 'Önbaxış'),
+    ], string="Mərhələ", default='select', required=True)
+    billing_month = fields.Date(string="Aid olduğu ay", required=True,
+                                default=lambda self: fields.Date.context_today(self).replace(day=1))
+    payment_method_lesson = fields.Selection([
+        ('cash', 'Nağd'),
+        ('card', 'Kartdan karta'),
+    ], string="Ödəniş Metodu", default='cash', required=True)
+    real_date = fields.Date(string="Ödəniş Tarixi", required=True, default=fields.Date.today,
+                            help="Kassaya mədaxilin düşəcəyi tarix")
+    lesson_ids = fields.Many2many('badminton.lesson.simple.genclik', 'badminton_lesson_billing_wizard_lesson_rel',
+                                  'wizard_id', 'lesson_id', string="Abunəliklər",
+                                  domain="[('state', '=', 'active')]",
+                                  default=lambda self: self._default_lesson_ids())
+
+    line_ids = fields.One2many('badminton.lesson.billing.wizard.line.genclik', 'wizard_id', string="Yaradılacaq Ödənişlər")
+    skipped_count = fields.Integer(string="Atlanan", readonly=True)
+    skipped_note = fields.Text(string="Atlanan Abunəliklər", readonly=True)
+    line_count = fields.Integer(string="Ödəniş Sayı", compute='_compute_totals')
+    total_amount = fields.Float(string="Ümumi Məbləğ", compute='_compute_totals')
+
+    @api.model
+    def _default_lesson_ids(self):
+        """Siyahıdan seçilmiş abunəliklər, yoxdursa bütün aktiv abunəliklər"""
+        Lesson = self.env['badminton.lesson.simple.genclik']
+        if self.env.context.get('active_model') == Lesson._name and self.env.context.get('active_ids'):
+            return Lesson.browse(self.env.context['active_ids']).filtered(lambda l: l.state == 'active')
+        return Lesson.search([('state', '=', 'active')])
+
+    @api.depends('line_ids.amount')
+    def _compute_totals(self):
+        for wizard in self:
+            wizard.line_count = len(wizard.line_ids)
+            wizard.total_amount = sum(wizard.line_ids.mapped('amount'))
+
+    def _get_month_range(self):
+        self.ensure_one()
+        month = self.billing_month.replace(day=1)
+        return month, month + relativedelta(months=1)
+
+    def _get_billed_lessons(self, lessons):
+        """Bu ay üçün artıq ödənişi olan abunəliklər - bir GROUP BY sorğusu ilə"""
+        month_start, month_end = self._get_month_range()
+        groups = self.env['badminton.lesson.payment.genclik']._read_group(
+            [('lesson_id', 'in', lessons.ids),
+             ('payment_date', '>=', month_start), ('payment_date', '<', month_end)],
+            ['lesson_id'])
+        return self.env['badminton.lesson.simple.genclik'].browse([lesson.id for lesson, in groups])
+
+    def _reopen(self):
+        return {
+            'type': 'ir.actions.act_window',
+            'name': 'Aylıq Toplu Ödəniş',
+            'res_model': self._name,
+            'res_id': self.id,
+            'view_mode': 'form',
+            'target': 'new',
+        }
+
+    def action_preview(self):
+        """Yaradılacaq ödənişləri göstər (hələ heç nə yazılmır)"""
+        self.ensure_one()
+        inactive = self.lesson_ids.filtered(lambda l: l.state != 'active')
+        zero_fee = (self.lesson_ids - inactive).filtered(lambda l: l.lesson_fee <= 0)
+        lessons = self.lesson_ids - inactive - zero_fee
+        billed = self._get_billed_lessons(lessons)
+        if not lessons - billed:
+            raise ValidationError('Ödəniş yaradılacaq aktiv abunəlik seçilməyib!')
+        month_start, _month_end = self._get_month_range()
+        self.line_ids = [(5, 0, 0)] + [(0, 0, {
+            'lesson_id': lesson.id,
+            'payment_date': lesson._get_expected_payment_date(month_start, lesson.payment_date),
+            'amount': lesson.lesson_fee,
+        }) for lesson in lessons - billed]
+        skipped = [(billed, 'bu ay artıq ödənilib'), (zero_fee, 'aylıq haqqı 0'), (inactive, 'aktiv deyil')]
+        self.skipped_count = sum(len(records) for records, _reason in skipped)
+        self.skipped_note = '\n'.join(
+            f"{lesson.name} - {lesson.partner_id.name}: {reason}"
+            for records, reason in skipped for lesson in records
+        )
+        self.state = 'preview'
+        return self._reopen()
+
+    def action_back(self):
+        self.ensure_one()
+        self.line_ids = [(5, 0, 0)]
+        self.skipped_note = False
+        self.state = 'select'
+        return self._reopen()
+
+    def action_confirm(self):
+        """Ödənişləri və kassa əməliyyatlarını bir tranzaksiyada yarat"""
+        self.ensure_one()
+        lines = self.line_ids.filtered(lambda l: l.amount > 0)
+        if not lines:
+            raise ValidationError('Yaradılacaq ödəniş yoxdur!')
+        lessons = lines.lesson_id
+        # Eyni anda işləyən ikinci sehrbaz eyni abunəliklərə ödəniş yaratmasın
+        self.env.cr.execute(
+            "SELECT id FROM badminton_lesson_simple_genclik WHERE id = ANY(%s) FOR UPDATE",
+            (lessons.ids,))
+        billed = self._get_billed_lessons(lessons)
+        # Hər sətir seçilmiş aya aid olmalıdır (təkrar yoxlama yalnız bu ay üçündür)
+        month_start, month_end = self._get_month_range()
+        lines = lines.filtered(
+            lambda l: l.lesson_id not in billed and month_start <= l.payment_date < month_end)
+
+        payments = self.env['badminton.lesson.payment.genclik'].create([{
+            'lesson_id': line.lesson_id.id,
+            'payment_method_lesson': self.payment_method_lesson,
+            'payment_date': line.payment_date,
+            'real_date': self.real_date,
+            'amount': line.amount,
+            'notes': 'Aylıq toplu ödəniş',
+        } for line in lines])
+
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'title': 'Uğurlu!',
+                'message': f'{len(payments)} ödəniş yaradıldı ({sum(payments.mapped("amount")):.2f} AZN). '
+                           f'Atlanan: {self.skipped_count + len(self.line_ids) - len(payments)}',
+                'type': 'success',
+                'sticky': False,
+                'next': {'type': 'ir.actions.act_window_close'}
+            }
+        }
+
+
+class BadmintonLessonBillingWizardLine(models.TransientModel):
+    _name = 'badminton.lesson.billing.wizard.line.genclik'
+    _description = 'Aylıq Toplu Ödəniş Sətri'
+
+    wizard_id = fields.Many2one('badminton.lesson.billing.wizard.genclik', required=True, ondelete='cascade')
+    lesson_id = fields.Many2one('badminton.lesson.simple.genclik', string="Abunəlik", required=True, readonly=True)
+    partner_id = fields.Many2one(related='lesson_id.partner_id', string="Müştəri")
+    payment_date = fields.Date(string="Aid olduğu ay", required=True, readonly=True)
+    amount = fields.Float(string="Məbləğ")
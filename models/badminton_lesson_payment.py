@@ -4,6 +4,10 @@ from datetime import datetime, timedelta
 import base64
 import os
 
+# Kassa qalığına təsir edən sahələr
+LEDGER_FIELDS = {'amount', 'payment_date', 'real_date', 'payment_method_lesson'}
+
+
 class BadmintonLessonPayment(models.Model):
     _name = 'badminton.lesson.payment.genclik'
     _description = 'Badminton Dərs Ödənişi (Gənclik)'
@@ -60,35 +64,47 @@ class BadmintonLessonPayment(models.Model):
                 
         return res
     
-    @api.model
-    def create(self, vals):
+    @api.model_create_multi
+    def create(self, vals_list):
         """Ödəniş yaradılanda kassaya əlavə et"""
-        lesson = self.env['badminton.lesson.simple.genclik'].browse(vals['lesson_id']) if vals.get('lesson_id') else False
-        if lesson:
-            default_due_date = lesson.payment_date or fields.Date.today()
-            vals.setdefault('real_date', default_due_date)
+        lessons = self.env['badminton.lesson.simple.genclik'].browse(
+            {vals['lesson_id'] for vals in vals_list if vals.get('lesson_id')})
+        for vals in vals_list:
+            if vals.get('lesson_id'):
+                lesson = lessons.browse(vals['lesson_id'])
+                default_due_date = lesson.payment_date or fields.Date.today()
+                vals.setdefault('real_date', default_due_date)
 
-        payment = super(BadmintonLessonPayment, self).create(vals)
+        payments = super(BadmintonLessonPayment, self).create(vals_list)
+        self.env['volan.cash.ledger.snapshot.genclik']._ledger_changed(payments._get_ledger_dates())
+        self.env['badminton.cash.balance.genclik']._invalidate_metrics_cache()
         
-        # Kassaya əməliyyat əlavə et
-        if payment.lesson_id and payment.amount > 0:
-            cash_date = payment.real_date or payment.payment_date or fields.Date.today()
-            
-            cash_flow = self.env['volan.cash.flow.genclik'].create({
-                'name': f"Badminton dərs ödənişi: {payment.lesson_id.name} - {cash_date}",
-                'date': cash_date,
-                'amount': payment.amount,
-                'transaction_type': 'income',
-                'category': 'badminton_lesson',
-                'sport_type': 'badminton',
-                'partner_id': payment.partner_id.id,
-                'related_model': 'badminton.lesson.payment.genclik',
-                'related_id': payment.id,
-                'notes': f"Ödənilən tarix: {payment.payment_date or '-'}"
-            })
-            payment.cash_flow_id = cash_flow.id
-        
-        return payment
+        # Kassaya əməliyyatları bir dəfəyə əlavə et
+        to_book = payments.filtered(lambda p: p.lesson_id and p.amount > 0)
+        if to_book:
+            cash_flows = self.env['volan.cash.flow.genclik'].create(
+                [payment._prepare_cash_flow_vals() for payment in to_book])
+            for payment, cash_flow in zip(to_book, cash_flows):
+                payment.cash_flow_id = cash_flow.id
+        
+        return payments
+
+    def _prepare_cash_flow_vals(self):
+        """Ödənişin kassa əməliyyatı üçün dəyərlər"""
+        self.ensure_one()
+        cash_date = self.real_date or self.payment_date or fields.Date.today()
+        return {
+            'name': f"Badminton dərs ödənişi: {self.lesson_id.name} - {cash_date}",
+            'date': cash_date,
+            'amount': self.amount,
+            'transaction_type': 'income',
+            'category': 'badminton_lesson',
+            'sport_type': 'badminton',
+            'partner_id': self.partner_id.id,
+            'related_model': 'badminton.lesson.payment.genclik',
+            'related_id': self.id,
+            'notes': f"Ödənilən tarix: {self.payment_date or '-'}"
+        }
 
     def write(self, vals):
         """Ödəniş dəyişdirildikdə kassanı da yenilə"""
@@ -97,7 +113,14 @@ class BadmintonLessonPayment(models.Model):
         if 'real_date' in vals and not self.env.user.has_group('base.group_system'):
             vals.pop('real_date')
 
+        ledger_changed = bool(LEDGER_FIELDS & set(vals))
+        ledger_dates = self._get_ledger_dates() if ledger_changed else []
+
         res = super(BadmintonLessonPayment, self).write(vals)
+
+        if ledger_changed:
+            self.env['volan.cash.ledger.snapshot.genclik']._ledger_changed(ledger_dates + self._get_ledger_dates())
+            self.env['badminton.cash.balance.genclik']._invalidate_metrics_cache()
         
         # Əgər məbləğ və ya kassaya düşmə tarixi dəyişibsə, kassanı yenilə
         if 'amount' in vals or 'real_date' in vals:
@@ -116,23 +139,19 @@ class BadmintonLessonPayment(models.Model):
         
         return res
     
+    def _get_ledger_dates(self):
+        """Ödənişin kassa qalığına düşdüyü günlər (payment_date və real_date-dən ən tezi)"""
+        return [min(filter(None, (payment.payment_date, payment.real_date)), default=None) for payment in self]
+
     def unlink(self):
         """Ödəniş silinərkən kassadan da sil"""
-        for payment in self:
-            # Kassa əməliyyatını tap və sil
-            cash_flows = self.env['volan.cash.flow.genclik'].search([
-                ('related_model', '=', 'badminton.lesson.payment.genclik'),
-                ('related_id', '=', payment.id)
-            ])
-            if cash_flows:
-                # related_model-i sıfırla ki, unlink qadağası işləməsin
-                cash_flows.write({'related_model': False, 'related_id': False})
-                cash_flows.unlink()
-            
-            # Əski sistemlə uyğunluq üçün
-            if payment.cash_flow_id:
-                payment.cash_flow_id.write({'related_model': False, 'related_id': False})
-                payment.cash_flow_id.unlink()
+        self.env['volan.cash.ledger.snapshot.genclik']._ledger_changed(self._get_ledger_dates())
+        self.env['badminton.cash.balance.genclik']._invalidate_metrics_cache()
+        # Bütün ödənişlərin kassa əməliyyatlarını bir dəfəyə tap və sil
+        cash_flows = self.env['volan.cash.flow.genclik']._get_for_sources(self)
+        # Əski sistemlə uyğunluq üçün
+        cash_flows |= self.cash_flow_id
+        cash_flows._unlink_moves()
         
         return super(BadmintonLessonPayment, self).unlink()
     
@@ -2,9 +2,11 @@
 from odoo import models, fields, api
 from odoo.exceptions import ValidationError
 from odoo.tools import float_compare
+from odoo.tools.sql import create_index
 from datetime import timedelta
 from dateutil.relativedelta import relativedelta
 from calendar import monthrange
+from collections import defaultdict
 
 STATE_SELECTION = [
     ('draft', 'Təsdiqlənməyib'),
@@ -17,6 +19,9 @@ STATE_SELECTION = [
     ('completed', 'Tamamlanıb'),
 ]
 
+# Kassa dashboard-undakı müştəri saylarına təsir edən sahələr
+CASH_METRICS_FIELDS = {'state', 'partner_id', 'payment_date'}
+
 class BadmintonLessonSimple(models.Model):
     _name = 'badminton.lesson.simple.genclik'
     _description = 'Badminton Dərsi'
@@ -36,8 +41,8 @@ class BadmintonLessonSimple(models.Model):
     
     # İştiraklar
     attendance_ids = fields.One2many('badminton.lesson.attendance.simple.genclik', 'lesson_id', string="Dərsə İştiraklar")
-    total_attendances = fields.Integer(string="Ümumi İştirak", compute='_compute_total_attendances')
-    current_month_attendances = fields.Integer(string="İştirak Sayı", compute='_compute_current_month_attendances', 
+    total_attendances = fields.Integer(string="Ümumi İştirak", compute='_compute_attendance_counts')
+    current_month_attendances = fields.Integer(string="İştirak Sayı", compute='_compute_attendance_counts', 
                                                 help="Ən son ödəniş tarixindən sonrakı iştiraklar")
     substitute_ids = fields.One2many('badminton.lesson.substitute.genclik', 'lesson_id', string="Əvəzedici Dərslər")
     substitute_count = fields.Integer(string="Əvəzedici Dərs Sayı", compute='_compute_substitute_count', store=True)
@@ -52,11 +57,11 @@ class BadmintonLessonSimple(models.Model):
     
     # Ödənişlər (One2Many)
     payment_ids = fields.One2many('badminton.lesson.payment.genclik', 'lesson_id', string="Ödənişlər", ondelete='restrict')
-    last_payment_date = fields.Date(string="Ən Son Ödəniş", compute='_compute_last_payment_date', store=True)
+    last_payment_date = fields.Date(string="Ən Son Ödəniş", compute='_compute_payment_aggregates', store=True)
     
     # Abunəlik məlumatları (ödənişlərə əsasən hesablanır)
-    total_months = fields.Integer(string="Ümumi Abunəlik (ay)", compute='_compute_total_months', store=True)
-    total_payments = fields.Float(string="Ümumi Ödəniş", compute='_compute_total_payments', store=True)
+    total_months = fields.Integer(string="Ümumi Abunəlik (ay)", compute='_compute_payment_aggregates', store=True)
+    total_payments = fields.Float(string="Ümumi Ödəniş", compute='_compute_payment_aggregates', store=True)
     
     # Dondurma məlumatları
     freeze_ids = fields.One2many('badminton.lesson.freeze.genclik', 'lesson_id', string="Dondurma Tarixçəsi")
@@ -81,30 +86,72 @@ class BadmintonLessonSimple(models.Model):
         ('warning', 'Xəbərdarlıq'),
         ('overdue', 'Vaxtından keçmiş'),
     ], string="Abunəlik Ödəniş Statusu", compute='_compute_subscription_payment_status', store=True)
+    subscription_status_change_date = fields.Date(
+        string="Statusun Növbəti Dəyişmə Tarixi", compute='_compute_subscription_payment_status',
+        store=True, index=True,
+        help="Ödəniş olmasa status bu tarixdə dəyişir (gündəlik yeniləmə yalnız bu abunəliklərə baxır)")
 
     @api.depends('payment_date', 'payment_ids.payment_date')
     def _compute_end_date(self):
+        """Bitmə tarixi - son ödəniş tarixi eyni GROUP BY sorğusundan"""
+        aggregates = self._get_payment_aggregates()
+        for lesson in self:
+            last_date = aggregates.get(lesson.id, (False,))[0]
+            lesson.end_date = lesson._get_end_date(last_date)
+
+    @api.depends('payment_ids', 'payment_ids.payment_date',
+                 'payment_ids.real_date', 'payment_ids.amount')
+    def _compute_payment_aggregates(self):
+        """Son ödəniş, ay sayı və ümumi ödəniş - bir GROUP BY sorğusu ilə"""
+        aggregates = self._get_payment_aggregates()
         for lesson in self:
-            # baza gün (başlama/payment_date gününü saxlayırıq)
-            base_day = lesson.payment_date.day if lesson.payment_date else False
+            last_date, last_real_date, count, total = aggregates.get(lesson.id, (False, False, 0, 0.0))
+            # Ən son ödəniş: real_date, yoxdursa payment_date
+            lesson.last_payment_date = last_real_date or last_date or False
+            # hər sətir 1 ay
+            lesson.total_months = count
+            lesson.total_payments = total
+
+    def _get_payment_aggregates(self):
+        """{lesson.id: (max payment_date, max real_date, say, cəm)}
+
+        Bazadakı abunəliklər üçün bir sorğu; yeni (hələ yazılmamış) qeydlər
+        üçün yaddaşdakı ödəniş sətirlərinə baxılır.
+        """
+        aggregates = {}
+        stored = self.filtered(lambda l: isinstance(l.id, int))
+        if stored:
+            for lesson, last_date, last_real_date, count, total in self.env['badminton.lesson.payment.genclik']._read_group(
+                    [('lesson_id', 'in', stored.ids)], ['lesson_id'],
+                    ['payment_date:max', 'real_date:max', '__count', 'amount:sum']):
+                aggregates[lesson.id] = (last_date, last_real_date, count, total)
+        for lesson in self - stored:
+            payments = lesson.payment_ids
+            aggregates[lesson.id] = (
+                max(filter(None, payments.mapped('payment_date')), default=False),
+                max(filter(None, payments.mapped('real_date')), default=False),
+                len(payments),
+                sum(payments.mapped('amount')),
+            )
+        return aggregates
 
-            # ən son ödəniş sətri (payment_date-ə görə)
-            payments = lesson.payment_ids.filtered(lambda p: p.payment_date)
-            last_date = payments.sorted('payment_date')[-1].payment_date if payments else False
+    def _get_end_date(self, last_date):
+        """Son ödənişin (yoxdursa başlama tarixinin) bir ay sonrası, başlama gününə görə"""
+        self.ensure_one()
+        # baza gün (başlama/payment_date gününü saxlayırıq)
+        base_day = self.payment_date.day if self.payment_date else False
 
-            # heç ödəniş yoxdursa fallback: lesson.payment_date
-            base_date = last_date or lesson.payment_date
+        # heç ödəniş yoxdursa fallback: lesson.payment_date
+        base_date = last_date or self.payment_date
+        if not base_date:
+            return False
 
-            if not base_date:
-                lesson.end_date = False
-                continue
+        next_month = base_date + relativedelta(months=1)
 
-            next_month = base_date + relativedelta(months=1)
-
-            # günü ayın maksimum gününə “clamp” edirik
-            day = base_day or next_month.day
-            max_day = monthrange(next_month.year, next_month.month)[1]
-            lesson.end_date = next_month.replace(day=min(day, max_day))
+        # günü ayın maksimum gününə “clamp” edirik
+        day = base_day or next_month.day
+        max_day = monthrange(next_month.year, next_month.month)[1]
+        return next_month.replace(day=min(day, max_day))
 
     @api.onchange('payment_date')
     def _onchange_payment_date(self):
@@ -114,64 +161,90 @@ class BadmintonLessonSimple(models.Model):
     @api.depends('payment_date', 'payment_ids', 'payment_ids.payment_date')
     def _compute_subscription_payment_status(self):
         """Başlanğıc tarixindən bu günə qədər hər ay üçün ödəniş olub-olmadığını yoxla"""
-        today = fields.Date.today()
+        statuses = self._get_subscription_statuses()
         for lesson in self:
-            if not lesson.payment_date:
-                lesson.subscription_payment_status = 'on_time'
-                continue
-            
-            # Başlanğıc tarixindən bu günə qədər neçə ay keçib?
-            start_date = lesson.payment_date
-            
-            # Əgər başlama tarixi gələcəkdədirsə, hələ ödəniş lazım deyil
-            if start_date > today:
-                lesson.subscription_payment_status = 'on_time'
-                continue
-            
-            # Başlanğıcdan bu günə qədər olan ayları yarat
-            current_check = start_date.replace(day=1)  # Başlanğıc ayının 1-i
-            today_month_start = today.replace(day=1)   # Bu ayın 1-i
-            
-            missing_months = []
-            while current_check <= today_month_start:
-                # Bu ay üçün ödəniş var mı?
-                payment_found = False
-                for payment in lesson.payment_ids:
-                    if payment.payment_date:
-                        # payment_date hansı aya aiddir?
-                        pay_month_start = payment.payment_date.replace(day=1)
-                        if pay_month_start == current_check:
-                            payment_found = True
-                            break
-                
-                if not payment_found:
-                    missing_months.append(current_check)
-                
-                # Növbəti aya keç
-                current_check = current_check + relativedelta(months=1)
-            
-            # Əgər ödənilməmiş ay varsa
-            if missing_months:
-                # Ən son ödənilməmiş ay (prioritet: ən köhnə ödənilməmiş)
-                first_missing = missing_months[0]
-                payment_day = lesson.payment_date.day
-                
-                # Bu ay üçün gözlənilən ödəniş tarixi
-                max_day_in_month = monthrange(first_missing.year, first_missing.month)[1]
-                expected_day = min(payment_day, max_day_in_month)
-                expected_payment_date = first_missing.replace(day=expected_day)
-                
-                # 5 gün əvvəl xəbərdarlıq
-                warning_date = expected_payment_date - timedelta(days=5)
-                
-                if today >= expected_payment_date:
-                    lesson.subscription_payment_status = 'overdue'
-                elif today >= warning_date:
-                    lesson.subscription_payment_status = 'warning'
-                else:
-                    lesson.subscription_payment_status = 'on_time'
-            else:
-                lesson.subscription_payment_status = 'on_time'
+            status, change_date = statuses[lesson.id]
+            lesson.subscription_payment_status = status
+            lesson.subscription_status_change_date = change_date
+
+    def _get_paid_months_map(self):
+        """{lesson.id: ödənilmiş ayların (ayın 1-i) çoxluğu}
+
+        Bazadakı abunəliklər üçün bütün (lesson_id, ay) cütləri bir GROUP BY
+        sorğusu ilə gəlir; yeni (hələ yazılmamış) qeydlər üçün yaddaşdakı
+        ödəniş sətirlərinə baxılır.
+        """
+        paid_months = defaultdict(set)
+        stored = self.filtered(lambda l: isinstance(l.id, int))
+        if stored:
+            for lesson, month in self.env['badminton.lesson.payment.genclik']._read_group(
+                    [('lesson_id', 'in', stored.ids), ('payment_date', '!=', False)],
+                    ['lesson_id', 'payment_date:month']):
+                paid_months[lesson.id].add(month)
+        for lesson in self - stored:
+            paid_months[lesson.id] = {
+                payment.payment_date.replace(day=1) for payment in lesson.payment_ids if payment.payment_date
+            }
+        return paid_months
+
+    def _get_subscription_statuses(self, today=None):
+        """{lesson.id: (status, növbəti dəyişmə tarixi)} - bütün abunəliklər üçün bir dəfəyə"""
+        today = today or fields.Date.today()
+        paid_months = self._get_paid_months_map()
+        return {
+            lesson.id: self._evaluate_payment_status(lesson.payment_date, paid_months[lesson.id], today)
+            for lesson in self
+        }
+
+    @staticmethod
+    def _get_expected_payment_date(month, start_date):
+        """Ay üçün gözlənilən ödəniş tarixi (başlama günü, ayın son gününə sıxılmış)"""
+        max_day_in_month = monthrange(month.year, month.month)[1]
+        return month.replace(day=min(start_date.day, max_day_in_month))
+
+    @classmethod
+    def _evaluate_payment_status(cls, start_date, paid_months, today):
+        """Ən köhnə ödənilməmiş aya görə (status, statusun növbəti dəyişmə tarixi).
+
+        Status yalnız iki həddə dəyişir: xəbərdarlıq tarixi (gözlənilən
+        tarix - 5 gün) və gözlənilən ödəniş tarixi. Vaxtı keçmiş status isə
+        yalnız ödənişlə dəyişir (tarix yoxdur).
+        """
+        if not start_date:
+            return 'on_time', False
+        # Əgər başlama tarixi gələcəkdədirsə, hələ ödəniş lazım deyil
+        if start_date > today:
+            return 'on_time', start_date
+
+        # Başlanğıc ayından bu aya qədər ödənilməli aylar
+        due_months = set()
+        month = start_date.replace(day=1)
+        today_month_start = today.replace(day=1)
+        while month <= today_month_start:
+            due_months.add(month)
+            month += relativedelta(months=1)
+
+        missing_months = due_months - paid_months
+        if not missing_months:
+            # Hər şey ödənilib: növbəti ödənilməmiş ay gələndə xəbərdarlıq başlayır
+            next_unpaid = month
+            while next_unpaid in paid_months:
+                next_unpaid += relativedelta(months=1)
+            warning_date = cls._get_expected_payment_date(next_unpaid, start_date) - timedelta(days=5)
+            return 'on_time', max(next_unpaid, warning_date)
+
+        # Prioritet: ən köhnə ödənilməmiş ay
+        first_missing = min(missing_months)
+        expected_payment_date = cls._get_expected_payment_date(first_missing, start_date)
+
+        # 5 gün əvvəl xəbərdarlıq
+        warning_date = expected_payment_date - timedelta(days=5)
+
+        if today >= expected_payment_date:
+            return 'overdue', False
+        if today >= warning_date:
+            return 'warning', expected_payment_date
+        return 'on_time', warning_date
 
     """
     @api.depends('start_date')
@@ -184,48 +257,43 @@ class BadmintonLessonSimple(models.Model):
                 lesson.end_date = False
     """
     
-    @api.depends('payment_ids')
-    def _compute_last_payment_date(self):
-        """Ən son ödənişin tarixini hesabla"""
-        for lesson in self:
-            payments_with_real_date = lesson.payment_ids.filtered(lambda p: p.real_date)
-            if payments_with_real_date:
-                latest_payment = payments_with_real_date.sorted('real_date', reverse=True)
-                lesson.last_payment_date = latest_payment[0].real_date if latest_payment else False
-            elif lesson.payment_ids:
-                latest_payment = lesson.payment_ids.sorted('payment_date', reverse=True)
-                lesson.last_payment_date = latest_payment[0].payment_date if latest_payment else False
-            else:
-                lesson.last_payment_date = False
-    
-    @api.depends('payment_ids')
-    def _compute_total_months(self):
-        """Ümumi abunəlik ayını ödənişlərə əsasən hesabla (hər sətir 1 ay)"""
-        for lesson in self:
-            lesson.total_months = len(lesson.payment_ids)
-    
-    @api.depends('payment_ids.amount')
-    def _compute_total_payments(self):
-        """Ümumi ödənişi hesabla"""
-        for lesson in self:
-            lesson.total_payments = sum(lesson.payment_ids.mapped('amount'))
-    
-    @api.depends('attendance_ids')
-    def _compute_total_attendances(self):
-        for lesson in self:
-            lesson.total_attendances = len(lesson.attendance_ids)
-    
-    @api.depends('attendance_ids.attendance_date', 'last_payment_date')
-    def _compute_current_month_attendances(self):
-        """Ən son ödəniş tarixindən sonra neçə dəfə dərsə gəldi"""
+    @api.depends('attendance_ids', 'attendance_ids.attendance_date', 'last_payment_date')
+    def _compute_attendance_counts(self):
+        """Ümumi iştirak və ən son ödəniş tarixindən sonra neçə dəfə dərsə gəldi"""
+        counts = self._get_attendance_counts()
         for lesson in self:
-            if lesson.last_payment_date and lesson.attendance_ids:
-                attendances_after_payment = lesson.attendance_ids.filtered(
-                    lambda a: a.attendance_date and a.attendance_date > lesson.last_payment_date
-                )
-                lesson.current_month_attendances = len(attendances_after_payment)
+            lesson.total_attendances, lesson.current_month_attendances = counts.get(lesson.id, (0, 0))
+
+    def _get_attendance_counts(self):
+        """{lesson.id: (ümumi say, son ödənişdən sonrakı say)}
+
+        Bazadakı abunəliklər üçün bir GROUP BY sorğusu (lesson_id, attendance_date
+        indeksi ilə); yeni (hələ yazılmamış) qeydlər üçün yaddaşdakı iştiraklara
+        baxılır. Son ödəniş yoxdursa bütün iştiraklar sayılır.
+        """
+        counts = {}
+        stored = self.filtered(lambda l: isinstance(l.id, int))
+        if stored:
+            self.env['badminton.lesson.attendance.simple.genclik'].flush_model(['lesson_id', 'attendance_date'])
+            self.env.cr.execute("""
+                SELECT a.lesson_id, COUNT(*),
+                       COUNT(*) FILTER (WHERE l.last_payment_date IS NULL
+                                           OR a.attendance_date > l.last_payment_date)
+                  FROM badminton_lesson_attendance_simple_genclik a
+                  JOIN unnest(%s::int[], %s::date[]) AS l(lesson_id, last_payment_date)
+                    ON l.lesson_id = a.lesson_id
+              GROUP BY a.lesson_id
+            """, (stored.ids, [lesson.last_payment_date or None for lesson in stored]))
+            counts = {lesson_id: (total, current) for lesson_id, total, current in self.env.cr.fetchall()}
+        for lesson in self - stored:
+            attendances = lesson.attendance_ids
+            if lesson.last_payment_date:
+                current = len(attendances.filtered(
+                    lambda a: a.attendance_date and a.attendance_date > lesson.last_payment_date))
             else:
-                lesson.current_month_attendances = len(lesson.attendance_ids)
+                current = len(attendances)
+            counts[lesson.id] = (len(attendances), current)
+        return counts
 
     @api.depends('substitute_ids')
     def _compute_substitute_count(self):
@@ -250,7 +318,6 @@ class BadmintonLessonSimple(models.Model):
                 f.freeze_end_date >= today
             )
             lesson.current_freeze_id = current_freeze[0].id if current_freeze else False
-            lesson.total_attendances = len(lesson.attendance_ids)
 
     @api.onchange('group_id')
     def _onchange_group_id(self):
@@ -358,7 +425,8 @@ class BadmintonLessonSimple(models.Model):
         # Əgər yaradılan zaman state=active isə və ödəniş yoxdursa, avtomatik ilk ödəniş yarat
         if lesson.state == 'active' and not lesson.payment_ids:
             lesson._create_initial_payment()
-        
+
+        self.env['badminton.cash.balance.genclik']._invalidate_metrics_cache()
         return lesson
     
     def write(self, vals):
@@ -394,7 +462,9 @@ class BadmintonLessonSimple(models.Model):
             for lesson in self:
                 if not lesson.payment_ids:
                     lesson._create_initial_payment()
-        
+
+        if CASH_METRICS_FIELDS.intersection(vals):
+            self.env['badminton.cash.balance.genclik']._invalidate_metrics_cache()
         return result
     
     def _create_initial_payment(self):
@@ -548,9 +618,24 @@ class BadmintonLessonSimple(models.Model):
     
     @api.model
     def cron_update_subscription_payment_status(self):
-        """Scheduled action - hər gün bütün aktiv abunəliklərin statusunu yenilə"""
-        active_lessons = self.search([('state', 'in', ['draft', 'active', 'frozen'])])
-        active_lessons._compute_subscription_payment_status()
+        """Scheduled action - hər gün yalnız statusu bu gün dəyişə bilən abunəlikləri yenilə"""
+        today = fields.Date.today()
+        due_lessons = self.search([
+            ('state', 'in', ['draft', 'active', 'frozen']),
+            ('subscription_status_change_date', '!=', False),
+            ('subscription_status_change_date', '<=', today),
+        ])
+        statuses = due_lessons._get_subscription_statuses(today)
+
+        # Eyni (status, tarix) olan qeydləri bir write ilə yaz
+        changed = defaultdict(list)
+        for lesson in due_lessons:
+            changed[statuses[lesson.id]].append(lesson.id)
+        for (status, change_date), lesson_ids in changed.items():
+            self.browse(lesson_ids).write({
+                'subscription_payment_status': status,
+                'subscription_status_change_date': change_date,
+            })
         return True
     
     @api.constrains('lesson_fee', 'zero_fee_reason')
@@ -597,6 +682,7 @@ class BadmintonLessonSimple(models.Model):
                     f'💡 Əvvəlcə bütün ödəniş sətirlərini silməlisiniz!'
                 )
         
+        self.env['badminton.cash.balance.genclik']._invalidate_metrics_cache()
         return super(BadmintonLessonSimple, self).unlink()
 
 class badmintonLessonScheduleSimple(models.Model):
@@ -670,4 +756,9 @@ class badmintonLessonAttendanceSimple(models.Model):
     scan_result = fields.Text(string="QR Nəticəsi")
     
     # Qeydlər
-    notes = fields.Text(string="Qeydlər")
\ No newline at end of file
+    notes = fields.Text(string="Qeydlər")
+
+    def init(self):
+        # Abunəlik üzrə iştirak sayları (son ödənişdən sonrakılar) üçün
+        create_index(self.env.cr, 'badminton_lesson_attendance_simple_genclik_lesson_date_idx',
+                     self._table, ['lesson_id', 'attendance_date'])
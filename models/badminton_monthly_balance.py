@@ -61,11 +61,29 @@ class BadmintonMonthlyBalance(models.Model):
             raise ValidationError('Aylıq paketdə kifayət qədər balans yoxdur')
 
         after = before - units_needed
-        self.remaining_units = after
+        vals = {'remaining_units': after}
         if after <= 0:
-            self.state = 'consumed'
+            vals['state'] = 'consumed'
+        self.write(vals)
         return units_needed, before, after
 
+    @api.model
+    def _get_hours_available_by_partner(self, partner_ids):
+        """Müştərilərin aktiv aylıq paketlərində qalan saatlar: {partner_id: saat} (bir sorğu)"""
+        if not partner_ids:
+            return {}
+        lines = self.search_read([
+            ('partner_id', 'in', partner_ids),
+            ('state', '=', 'active'),
+            ('remaining_units', '>', 0),
+        ], ['partner_id', 'remaining_units', 'deduction_factor'])
+        hours = {}
+        for line in lines:
+            factor = line['deduction_factor'] or 1.0
+            partner_id = line['partner_id'][0]
+            hours[partner_id] = hours.get(partner_id, 0.0) + line['remaining_units'] / factor
+        return hours
+
     @api.model
     def cron_expire_monthly_balances(self):
         today = fields.Date.today()
@@ -4,6 +4,9 @@ from odoo.exceptions import ValidationError
 from datetime import datetime, timedelta
 from dateutil.relativedelta import relativedelta
 
+# Kassa qalığına təsir edən sahələr
+LEDGER_FIELDS = {'state', 'payment_date', 'payment_method', 'amount_paid'}
+
 class BadmintonSale(models.Model):
     _name = 'badminton.sale.genclik'
     _description = 'Badminton Satışı'
@@ -118,6 +121,8 @@ class BadmintonSale(models.Model):
             vals['name'] = self.env['ir.sequence'].sudo().next_by_code('badminton.sale.genclik')
             
         sale = super(BadmintonSale, self).create(vals)
+        self.env['volan.cash.ledger.snapshot.genclik']._ledger_changed(sale._get_ledger_dates())
+        self.env['badminton.cash.balance.genclik']._invalidate_metrics_cache()
         
         # Əgər satış 'paid' vəziyyətində yaradılırsa, dərhal balansı artır və kassaya əlavə et
         if sale.state == 'paid':
@@ -198,18 +203,26 @@ class BadmintonSale(models.Model):
             if sale.state in ['draft', 'confirmed']:
                 sale.state = 'cancelled'
     
+    def write(self, vals):
+        """Ödənilmiş satış dəyişəndə kassa snapshotlarını yenilə"""
+        ledger_changed = bool(LEDGER_FIELDS & set(vals))
+        ledger_dates = self._get_ledger_dates() if ledger_changed else []
+        res = super(BadmintonSale, self).write(vals)
+        if ledger_changed:
+            self.env['volan.cash.ledger.snapshot.genclik']._ledger_changed(ledger_dates + self._get_ledger_dates())
+            self.env['badminton.cash.balance.genclik']._invalidate_metrics_cache()
+        return res
+
+    def _get_ledger_dates(self):
+        """Satışın kassa qalığına düşdüyü günlər"""
+        return [sale.payment_date.date() if sale.payment_date else None for sale in self]
+
     def unlink(self):
         """Satış silinərkən əlaqəli kassa əməliyyatını da sil"""
-        # Əvvəlcə kassa əməliyyatlarını tap və sil
-        for sale in self:
-            cash_flows = self.env['volan.cash.flow.genclik'].search([
-                ('related_model', '=', 'badminton.sale.genclik'),
-                ('related_id', '=', sale.id)
-            ])
-            if cash_flows:
-                # related_model-i sıfırla ki, unlink qadağası işləməsin
-                cash_flows.write({'related_model': False, 'related_id': False})
-                cash_flows.unlink()
+        self.env['volan.cash.ledger.snapshot.genclik']._ledger_changed(self._get_ledger_dates())
+        self.env['badminton.cash.balance.genclik']._invalidate_metrics_cache()
+        # Əvvəlcə bütün satışların kassa əməliyyatlarını bir dəfəyə tap və sil
+        self.env['volan.cash.flow.genclik']._get_for_sources(self)._unlink_moves()
         
         return super(BadmintonSale, self).unlink()
     
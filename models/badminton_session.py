@@ -1,11 +1,30 @@
 # -*- coding: utf-8 -*-
 from odoo import models, fields, api
 from odoo.exceptions import ValidationError
-from datetime import timedelta
+from odoo.tools.sql import create_index
+from datetime import datetime, time, timedelta
+from markupsafe import Markup
 import logging
 
 _logger = logging.getLogger(__name__)
 
+# Növbə yerlərinin cursor səviyyəsində keşlənməsi üçün açar
+QUEUE_CACHE_KEY = 'volan_genclikk.session_queue_positions'
+
+# Sessiyanın bitməsinə neçə dəqiqə qalmış xəbərdarlıq göndərilir
+SESSION_WARNING_MINUTES = 5
+# Timer addımı xəta ilə bitəndə cron bu qədər dəqiqədən sonra yenidən işləyir
+SESSION_TIMER_RETRY_MINUTES = 5
+
+# Reception ekranı mesajları yalnız daxili istifadəçilərin qrup kanalına göndərilir
+SESSION_BOARD_GROUP = 'base.group_user'
+
+# Növbə qəbulunun tranzaksiya uğurla bitdikdən sonra bir dəfə işləməsi üçün açar
+ADMISSION_PENDING_KEY = 'volan_genclikk.session_admission_pending'
+
+# Kassa dashboard-undakı giriş saylarına təsir edən sahələr
+CASH_METRICS_FIELDS = {'state', 'start_time', 'payment_type', 'promo_type'}
+
 
 class BadmintonSession(models.Model):
     _name = 'badminton.session.genclik'
@@ -69,6 +88,25 @@ class BadmintonSession(models.Model):
     # one-time flag, чтобы не спамить одно и то же окончание
     warn10_sent = fields.Boolean(string="5 dəq xəbərdarlığı göndərilib", default=False, index=True)
 
+    def init(self):
+        """Sessiya "isti" sorğularının domenlərinə uyğun partial indekslər"""
+        live = "state IN ('active', 'extended')"
+        # _deduct_balance_on_start, start_session_by_qr: partnerin aktiv sessiyası
+        create_index(self.env.cr, 'badminton_session_genclik_live_partner_idx',
+                     self._table, ['partner_id'], where=live)
+        # timer, cron-lar, get_active_sessions: aktiv sessiyalar end_time üzrə
+        create_index(self.env.cr, 'badminton_session_genclik_live_end_time_idx',
+                     self._table, ['end_time'], where=live)
+        # xəbərdarlıq göndərilməmiş aktiv sessiyalar
+        create_index(self.env.cr, 'badminton_session_genclik_unwarned_end_time_idx',
+                     self._table, ['end_time'], where=f"{live} AND warn10_sent IS NOT TRUE")
+        # növbə: gözləmədə olanlar created_at sırası ilə
+        create_index(self.env.cr, 'badminton_session_genclik_draft_queue_idx',
+                     self._table, ['created_at', 'id'], where="state = 'draft'")
+        # kassa giriş hesabatı: tamamlanmış sessiyalar start_time aralığı üzrə
+        create_index(self.env.cr, 'badminton_session_genclik_completed_start_idx',
+                     self._table, ['start_time'], where="state = 'completed'")
+
     # ---------- computed ----------
     @api.depends('end_time', 'state')
     def _compute_time_expired(self):
@@ -88,31 +126,55 @@ class BadmintonSession(models.Model):
     @api.depends('partner_id')
     def _compute_has_package(self):
         """Müştərinin aktiv paket sənədi olub-olmadığını yoxla"""
+        partner_map = self._get_active_package_map(self.partner_id.ids)
         for rec in self:
-            if rec.partner_id:
-                package_count = self.env['badminton.monthly.balance.genclik'].search_count([
-                    ('partner_id', '=', rec.partner_id.id),
-                    ('state', '=', 'active'),
-                    ('remaining_units', '>', 0)
-                ])
-                rec.has_package = package_count > 0
-            else:
-                rec.has_package = False
+            rec.has_package = partner_map.get(rec.partner_id.id, False)
+
+    @api.model
+    def _get_active_package_map(self, partner_ids):
+        """Bütün müştərilər üçün bir qruplaşdırılmış sorğu: {partner_id: aktiv paket var}"""
+        if not partner_ids:
+            return {}
+        groups = self.env['badminton.monthly.balance.genclik']._read_group(
+            [
+                ('partner_id', 'in', partner_ids),
+                ('state', '=', 'active'),
+                ('remaining_units', '>', 0),
+            ],
+            ['partner_id'],
+            ['__count'],
+        )
+        return {partner.id: count > 0 for partner, count in groups}
 
     def _compute_queue_number(self):
         """Gözləmədə olan sessiyalar üçün növbə nömrəsini hesabla"""
+        positions = self._get_queue_positions()
         for rec in self:
-            if rec.state == 'draft':
-                # Gözləmədə olan və bu sessiyadan əvvəl yaradılmış sessiyaları say
-                queue_position = self.search_count([
-                    ('state', '=', 'draft'),
-                    ('created_at', '<', rec.created_at),
-                    ('id', '!=', rec.id)
-                ])
-                rec.queue_number = queue_position + 1
-            else:
-                rec.queue_number = 0
-    
+            rec.queue_number = positions.get(rec.id, 0) if rec.state == 'draft' else 0
+
+    def _get_queue_positions(self):
+        """Bütün gözləmədə olan sessiyaların növbə yerlərini bir sorğu ilə hesabla.
+
+        Nəticə cari sorğu (cursor) üçün keşlənir ki, list və form view eyni
+        hesablamanı təkrar etməsin. Növbəyə təsir edən dəyişikliklərdə
+        ``_invalidate_queue_positions`` keşi sıfırlayır.
+        """
+        cache = self.env.cr.cache
+        if QUEUE_CACHE_KEY not in cache:
+            self.flush_model(['state', 'created_at'])
+            # RANK: eyni created_at-lı sessiyalar eyni növbə nömrəsini alır
+            self.env.cr.execute("""
+                SELECT id, RANK() OVER (ORDER BY created_at)
+                  FROM badminton_session_genclik
+                 WHERE state = 'draft'
+            """)
+            cache[QUEUE_CACHE_KEY] = dict(self.env.cr.fetchall())
+        return cache[QUEUE_CACHE_KEY]
+
+    def _invalidate_queue_positions(self):
+        self.env.cr.cache.pop(QUEUE_CACHE_KEY, None)
+        self.invalidate_model(['queue_number'])
+
     def _get_max_capacity(self):
         """Zal kapasiteti - System Parameter-dən oxunur"""
         capacity = self.env['ir.config_parameter'].sudo().get_param(
@@ -123,16 +185,19 @@ class BadmintonSession(models.Model):
     
     def _get_active_sessions_count(self):
         """Hal-hazırda aktiv və uzadılmış sessiyaların sayı"""
-        return self.search_count([
-            ('state', 'in', ['active', 'extended'])
-        ])
+        return self.env['badminton.court.occupancy.genclik'].sudo()._get_active_count()
     
-    def _check_capacity(self):
-        """Zal kapasitetini yoxla"""
-        active_count = self._get_active_sessions_count()
+    def _check_capacity(self, seats=1):
+        """Zal kapasitetini yoxla.
+
+        Aktiv sessiyalar filialın doluluq sətri kilidləndikdən sonra sayılır,
+        sətir tranzaksiyanın sonuna qədər kilidli qalır, ona görə eyni anda
+        sessiya başladan ikinci istifadəçi birincinin nəticəsini gözləyir.
+        """
+        active_count = self.env['badminton.court.occupancy.genclik'].sudo()._lock_branch()
         max_capacity = self._get_max_capacity()
         
-        if active_count >= max_capacity:
+        if active_count + seats > max_capacity:
             raise ValidationError(
                 f'⚠️ Zal doludur!\n'
                 f'Aktiv sessiyalar: {active_count}/{max_capacity}\n'
@@ -160,14 +225,22 @@ class BadmintonSession(models.Model):
             # Yalnız sessiya başladılanda set ediləcək
         
         records = super().create(vals_list)
+        records._invalidate_queue_positions()
+        self.env['badminton.cash.balance.genclik']._invalidate_metrics_cache()
         return records
 
     def write(self, vals):
         res = super().write(vals)
+        if 'state' in vals or 'created_at' in vals:
+            self._invalidate_queue_positions()
         # при изменении конца сессии заново разрешаем предупреждение
         if 'end_time' in vals:
-            for rec in self.filtered(lambda r: r.state in ('active', 'extended')):
-                rec.warn10_sent = False
+            live = self.filtered(lambda r: r.state in ('active', 'extended'))
+            if live and 'warn10_sent' not in vals:
+                super(BadmintonSession, live).write({'warn10_sent': False})
+            live._arm_session_timer()
+        if CASH_METRICS_FIELDS.intersection(vals):
+            self.env['badminton.cash.balance.genclik']._invalidate_metrics_cache()
         return res
 
     @api.onchange('partner_id')
@@ -185,6 +258,12 @@ class BadmintonSession(models.Model):
         elif self.promo_type in ['1fit', 'push30', 'tripsome']:
             self.duration_hours = 1.0
 
+    def unlink(self):
+        res = super().unlink()
+        self._invalidate_queue_positions()
+        self.env['badminton.cash.balance.genclik']._invalidate_metrics_cache()
+        return res
+
     # ---------- helpers / flows ----------
     def _deduct_balance_on_start(self):
         """Sessiya başladıqda balansı azaldır - daxili helper metod"""
@@ -225,20 +304,11 @@ class BadmintonSession(models.Model):
         # ÖNCƏ: Zal kapasitetini yoxla
         self._check_capacity()
         
-        # Vaxtları set et
-        now = fields.Datetime.now()
-        end_time = now + timedelta(hours=self.duration_hours)
-        
         # Balansı azalt
         self._deduct_balance_on_start()
         
         # Vaxtları və state-i yenilə
-        self.write({
-            'start_time': now,
-            'end_time': end_time,
-            'state': 'active',
-            'warn10_sent': False,
-        })
+        self._mark_sessions_started()
 
         # Növbə nömrələrini yenilə (compute field olduğu üçün avtomatik olacaq)
         
@@ -248,6 +318,98 @@ class BadmintonSession(models.Model):
             'tag': 'reload',
         }
 
+    def _mark_sessions_started(self):
+        """Balansı artıq çıxılmış sessiyaları aktiv et (eyni müddətlilər bir write ilə)"""
+        now = fields.Datetime.now()
+        for duration, sessions in self.grouped('duration_hours').items():
+            sessions.write({
+                'start_time': now,
+                'end_time': now + timedelta(hours=duration),
+                'state': 'active',
+                'warn10_sent': False,
+            })
+
+    # ---------- queue admission ----------
+    @api.model
+    def _is_auto_admission_enabled(self):
+        value = self.env['ir.config_parameter'].sudo().get_param(
+            'volan_genclikk.session_auto_admission',
+            default='False'
+        )
+        return value not in ('False', 'false', '0', '')
+
+    @api.model
+    def _schedule_queue_admission(self):
+        """Tamamlanma commit olunduqdan sonra növbəni ayrıca tranzaksiyada qəbul et.
+
+        Beləliklə qəbul zamanı yaranan hər hansı xəta sessiyanın tamamlanmasını
+        (və ya timer cron-unu) geri qaytarmır.
+        """
+        if not self._is_auto_admission_enabled():
+            return
+        postcommit = self.env.cr.postcommit
+        if ADMISSION_PENDING_KEY in postcommit.data:
+            return
+        postcommit.data[ADMISSION_PENDING_KEY] = True
+        dbname, uid, context = self.env.cr.dbname, self.env.uid, dict(self.env.context)
+
+        @postcommit.add
+        def admit_queued_sessions():
+            registry = self.env.registry
+            try:
+                with registry.cursor() as cr:
+                    env = api.Environment(cr, uid, context)
+                    env[self._name]._admit_queued_sessions()
+            except Exception:
+                _logger.exception("Queued session admission failed on %s.", dbname)
+
+    @api.model
+    def _admit_queued_sessions(self):
+        """Boşalan yerlər qədər növbədəki sessiyaları başlat.
+
+        Hər namizəd öz savepoint-ində başladılır: balansı çatmayan (və ya
+        başqa səbəbdən başlaya bilməyən) sessiyalar növbədə qalır və növbəti
+        sessiya yoxlanılır.
+        """
+        if not self._is_auto_admission_enabled():
+            return self.browse()
+
+        occupancy = self.env['badminton.court.occupancy.genclik'].sudo()
+        free_seats = self._get_max_capacity() - occupancy._lock_branch()
+        admitted = self.browse()
+        skipped = self.browse()
+        while len(admitted) < free_seats:
+            candidates = self.search([
+                ('state', '=', 'draft'),
+                ('id', 'not in', skipped.ids),
+            ], order='created_at asc, id asc', limit=free_seats - len(admitted))
+            if not candidates:
+                break
+            for session in candidates:
+                try:
+                    with self.env.cr.savepoint():
+                        session._deduct_balance_on_start()
+                        session._mark_sessions_started()
+                    admitted |= session
+                except ValidationError as e:
+                    skipped |= session
+                    _logger.info("Queued session %s not admitted: %s", session.id, e)
+                except Exception:
+                    skipped |= session
+                    _logger.exception("Queued session %s not admitted.", session.id)
+
+        if admitted:
+            self._send_board_message('volan_genclikk/session_admitted', {
+                'sessions': [{
+                    'id': s.id,
+                    'name': s.name,
+                    'partner_name': s.partner_id.name,
+                    'end_datetime': fields.Datetime.to_string(s.end_time),
+                } for s in admitted],
+            })
+            _logger.info("Auto-admitted %s queued sessions.", len(admitted))
+        return admitted
+
     def start_session_by_qr(self, qr_data):
         try:
             if "ID:" not in qr_data or "NAME:" not in qr_data:
@@ -295,24 +457,26 @@ class BadmintonSession(models.Model):
             return {'status': 'error', 'message': f'Xəta baş verdi: {str(e)}'}
 
     def extend_session(self, additional_hours=1.0):
-        for s in self.filtered(lambda r: r.state in ('active', 'extended')):
+        """Sessiyaları uzat: hər sessiya üçün balans çıxılır və bir write edilir.
 
-            # PROMO sessiya: balans çıxma, sadəcə vaxtı uzat
-            if s.promo_type:
-                s.extended_time += additional_hours
-                s.end_time = s.end_time + timedelta(hours=additional_hours)
-                s.state = 'extended'
-                s.notes = (f"Promo sessiya uzadıldı (+{additional_hours} saat). "
-                        f"Tətbiq: {s.promo_type}. Balans çıxılmadı.")
-                s.warn10_sent = False
-                continue
+        Bir neçə sessiya eyni anda uzadıla bilər; qeyd üçün lazım olan
+        balanslar istehlak addımının qaytardığı dəyərlərdən və bütün
+        müştərilər üçün bir sorğudan götürülür.
+        """
+        sessions = self.filtered(lambda r: r.state in ('active', 'extended'))
+        if not sessions:
+            return True
 
+        package_hours_left = {}
+        for s in sessions.filtered(lambda r: not r.promo_type):
             # normal flow (balans çıx)
             if s.session_package_id:
-                s._consume_selected_package(
+                units_used, before, after = s._consume_selected_package(
                     additional_hours, 'extension',
                     f"Sessiya uzadıldı: {s.name} (+{additional_hours} saat)"
                 )
+                factor = s.session_package_id.deduction_factor or 1.0
+                package_hours_left[s.id] = after / factor
             else:
                 s.partner_id.consume_genclik_badminton_hours(
                     additional_hours,
@@ -321,14 +485,31 @@ class BadmintonSession(models.Model):
                     session=s
                 )
 
-            s.extended_time += additional_hours
-            s.end_time = s.end_time + timedelta(hours=additional_hours)
-            s.state = 'extended'
-            s.notes = (f"Sessiya {additional_hours} saat uzadıldı. "
-                    f"Aylıq balans: {s.partner_id.get_monthly_hours_available()} saat | "
-                    f"Normal balans: {s.partner_id.badminton_balance}")
-            s.warn10_sent = False
+        partner_ids = sessions.filtered(
+            lambda r: not r.promo_type and not r.session_package_id
+        ).partner_id.ids
+        monthly_hours = self.env['badminton.monthly.balance.genclik']._get_hours_available_by_partner(partner_ids)
 
+        for s in sessions:
+            if s.promo_type:
+                # PROMO sessiya: balans çıxma, sadəcə vaxtı uzat
+                notes = (f"Promo sessiya uzadıldı (+{additional_hours} saat). "
+                         f"Tətbiq: {s.promo_type}. Balans çıxılmadı.")
+            elif s.id in package_hours_left:
+                notes = (f"Sessiya {additional_hours} saat uzadıldı. "
+                         f"Paket balansı: {package_hours_left[s.id]:g} saat")
+            else:
+                notes = (f"Sessiya {additional_hours} saat uzadıldı. "
+                         f"Aylıq balans: {monthly_hours.get(s.partner_id.id, 0.0):g} saat | "
+                         f"Normal balans: {s.partner_id.badminton_balance}")
+            s.write({
+                'extended_time': s.extended_time + additional_hours,
+                'end_time': s.end_time + timedelta(hours=additional_hours),
+                'state': 'extended',
+                'notes': notes,
+                'warn10_sent': False,
+            })
+        return True
 
     def _consume_selected_package(self, hours, transaction_type, description):
         self.ensure_one()
@@ -347,6 +528,7 @@ class BadmintonSession(models.Model):
             )
 
         units_used, before, after = line.consume_hours(hours)
+        return units_used, before, after
         """ Close history 
         self.env['badminton.balance.history.genclik'].create({
             'partner_id': self.partner_id.id,
@@ -372,17 +554,76 @@ class BadmintonSession(models.Model):
         }
 
     def complete_session(self):
-        for s in self.filtered(lambda r: r.state in ('active', 'extended')):
+        sessions = self.filtered(lambda r: r.state in ('active', 'extended'))
+        for s in sessions:
             s.write({
                 'state': 'completed',
                 'completion_time': fields.Datetime.now(),
                 'notes': (f"Sessiya tamamlandı: {fields.Datetime.now()}. "
                           f"İstifadə edilən saat: {s.duration_hours + s.extended_time}")
             })
+        if sessions:
+            self._schedule_queue_admission()
+
+
+    # --------- session timer ----------
+    def _arm_session_timer(self):
+        """Bu sessiyaların ən yaxın xəbərdarlıq anı üçün timer cron-u planla"""
+        dues = [
+            s.end_time - timedelta(minutes=SESSION_WARNING_MINUTES)
+            for s in self
+            if s.end_time and s.state in ('active', 'extended')
+        ]
+        if dues:
+            self._trigger_session_timer(min(dues))
+
+    @api.model
+    def _trigger_session_timer(self, at):
+        cron = self.env.ref('volan_genclikk.ir_cron_badminton_session_timer', raise_if_not_found=False)
+        if cron and at:
+            cron.sudo()._trigger(at=at)
 
+    @api.model
+    def _get_next_timer_due(self):
+        """Növbəti xəbərdarlıq və ya bitmə anı (end_time/warn10_sent üzrə bir sorğu)"""
+        self.flush_model(['state', 'end_time', 'warn10_sent'])
+        self.env.cr.execute("""
+            SELECT MIN(CASE WHEN warn10_sent THEN end_time
+                            ELSE end_time - make_interval(mins => %s) END)
+              FROM badminton_session_genclik
+             WHERE state IN ('active', 'extended')
+               AND end_time IS NOT NULL
+        """, (SESSION_WARNING_MINUTES,))
+        return self.env.cr.fetchone()[0]
 
     @api.model
-    def cron_send_session_warnings(self, warning_minutes=5):
+    def _cron_session_timer(self):
+        """Timer cron: vaxtı çatan xəbərdarlıqları göndər, bitmiş sessiyaları
+        tamamla və cron-u növbəti lazımi an üçün yenidən planla.
+
+        Hər addım öz savepoint-ində işləyir və cron hər halda yenidən
+        planlanır; addımlardan biri xəta versə, cron qısa müddətdən sonra
+        yenidən cəhd edir.
+        """
+        failed = False
+        try:
+            for step in (self.cron_send_session_warnings, self._auto_complete_expired_sessions):
+                try:
+                    with self.env.cr.savepoint():
+                        step()
+                except Exception:
+                    failed = True
+                    _logger.exception("Session timer step %s failed.", step.__name__)
+        finally:
+            next_due = self._get_next_timer_due()
+            if failed:
+                retry_at = fields.Datetime.now() + timedelta(minutes=SESSION_TIMER_RETRY_MINUTES)
+                next_due = max(next_due, retry_at) if next_due else retry_at
+            self._trigger_session_timer(next_due)
+        return True
+
+    @api.model
+    def cron_send_session_warnings(self, warning_minutes=SESSION_WARNING_MINUTES):
         """
         Крон: уведомляем за ~5 минут до конца через Odoo Bot.
         """
@@ -400,50 +641,106 @@ class BadmintonSession(models.Model):
             _logger.info("No sessions found for 10-min warning.")
             return True
 
+        warnings = [{
+            'partner_name': s.partner_id.name,
+            'minutes_left': max(1, int((s.end_time - now).total_seconds() // 60)),
+        } for s in sessions]
+
+        mode = self._get_session_warning_mode()
         # Находим Odoo Bot и канал 'General'
         bot_user = self.env.ref('base.user_root')
-        general_channel = self.env.ref('mail.channel_all_employees')
-        
+        general_channel = self.env.ref('mail.channel_all_employees', raise_if_not_found=False)
+
         if not general_channel:
             _logger.warning("General channel not found. Cannot send notification.")
             return False
 
-        for s in sessions:
-            mins_left = max(1, int((s.end_time - now).total_seconds() // 60))
-            note = f"{s.partner_id.name} üçün sessiyanın bitməsinə {mins_left} dəqiqə qaldı."
-
-            # Отправляем сообщение в чат канала 'General' от имени Odoo Bot
+        if mode == 'digest':
+            # Bütün bitən sessiyalar üçün bir mesaj - bir fan-out
+            bodies = [Markup('<br/>').join(
+                [f"Sessiyaların bitməsinə az qalıb ({len(warnings)}):"] +
+                [f"• {w['partner_name']}: {w['minutes_left']} dəqiqə" for w in warnings]
+            )]
+        else:
+            bodies = [
+                f"{w['partner_name']} üçün sessiyanın bitməsinə {w['minutes_left']} dəqiqə qaldı."
+                for w in warnings
+            ]
+
+        # Отправляем сообщение в чат канала 'General' от имени Odoo Bot
+        partner_ids = general_channel.channel_partner_ids.ids
+        for body in bodies:
             general_channel.with_user(bot_user).message_post(
-                body=note,
+                body=body,
                 message_type='notification',
                 subtype_xmlid='mail.mt_comment',
-                partner_ids=general_channel.channel_partner_ids.ids,
+                partner_ids=partner_ids,
             )
 
-            s.warn10_sent = True
-            _logger.info("Sent Odoo Bot warning for session %s. %s mins left.", s.id, mins_left)
-
+        sessions.write({'warn10_sent': True})
+        _logger.info("Sent %s session warning(s) in '%s' mode.", len(sessions), mode)
         return True
+
+    @api.model
+    def _get_session_warning_mode(self):
+        """Xəbərdarlıq rejimi: 'message' (hər sessiya üçün ayrı) və ya 'digest'"""
+        mode = self.env['ir.config_parameter'].sudo().get_param(
+            'volan_genclikk.session_warning_mode',
+            default='digest'
+        )
+        return mode if mode in ('message', 'digest') else 'digest'
+
+    # --------- statistics ----------
+    @api.model
+    def _get_entry_domain(self, date_from, date_to):
+        """Tarix aralığında (hər iki gün daxil) tamamlanmış girişlər"""
+        return [
+            ('state', '=', 'completed'),
+            ('start_time', '>=', datetime.combine(date_from, time.min)),
+            ('start_time', '<=', datetime.combine(date_to, time.max)),
+        ]
+
+    @api.model
+    def _get_entry_statistics(self, date_from, date_to, groupby=('payment_type', 'promo_type', 'start_time:day')):
+        """Girişlərin sayı bir GROUP BY sorğusu ilə: {(qrup dəyərləri): say}
+
+        groupby istənilən sahə və ya tarix granulyarlığı ola bilər
+        (məs. 'start_time:hour' saatlıq hesabat üçün).
+        """
+        groups = self._read_group(self._get_entry_domain(date_from, date_to), list(groupby), ['__count'])
+        return {tuple(group[:-1]): group[-1] for group in groups}
+
     # --------- simple queries ----------
     @api.model
     def get_active_sessions(self):
         """Hal-hazırda aktiv olan sessiyaları gətir"""
         active_sessions = self.search([('state', 'in', ['active', 'extended'])])
-        data = []
         now = fields.Datetime.now()
-        for s in active_sessions:
-            remaining = (s.end_time - now) if s.end_time else timedelta()
-            data.append({
-                'id': s.id,
-                'name': s.name,
-                'partner_name': s.partner_id.name,
-                'start_datetime': fields.Datetime.to_string(s.start_time),
-                'end_datetime': fields.Datetime.to_string(s.end_time),
-                'minutes_remaining': max(0, int(remaining.total_seconds() // 60)),
-                'state': s.state,
-            })
+        data = [s._get_board_values(now) for s in active_sessions]
         return {'sessions': data}
 
+    # --------- reception board (bus) ----------
+    def _get_board_values(self, now=None):
+        self.ensure_one()
+        now = now or fields.Datetime.now()
+        remaining = (self.end_time - now) if self.end_time else timedelta()
+        return {
+            'id': self.id,
+            'name': self.name,
+            'partner_name': self.partner_id.name,
+            'start_datetime': fields.Datetime.to_string(self.start_time),
+            'end_datetime': fields.Datetime.to_string(self.end_time),
+            'minutes_remaining': max(0, int(remaining.total_seconds() // 60)),
+            'queue_number': self.queue_number,
+            'state': self.state,
+        }
+
+    @api.model
+    def _send_board_message(self, notification_type, payload):
+        """Reception ekranına bus mesajı (daxili istifadəçilərin qrup kanalı)"""
+        channel = self.env.ref(SESSION_BOARD_GROUP)
+        self.env['bus.bus']._sendone(channel, notification_type, payload)
+
     @api.model
     def check_expired_sessions(self):
         """По желанию — просто сообщение в чат о просроченных."""
@@ -462,6 +759,9 @@ class BadmintonSession(models.Model):
         """Автодоворот просроченных в completed (если нужно)."""
         now = fields.Datetime.now()
         expired = self.search([('state', 'in', ['active', 'extended']), ('end_time', '<', now)])
-        for s in expired:
-            s.write({'state': 'completed', 'completion_time': now})
+        if expired:
+            # Bir recordset write: bir UPDATE, bir recompute və bir tracking keçidi
+            expired.write({'state': 'completed', 'completion_time': now})
+            _logger.info("Auto-completed %s expired sessions.", len(expired))
+            self._schedule_queue_admission()
         return True
\ No newline at end of file
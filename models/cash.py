@@ -1,8 +1,18 @@
 from odoo import models, fields, api
-from odoo.osv.expression import OR
+from odoo.osv.expression import OR, FALSE_DOMAIN
+from odoo.tools import ormcache
+from odoo.tools.sql import create_index
+from urllib.parse import urlencode
 from odoo.exceptions import ValidationError
 from datetime import datetime, timedelta
 from dateutil.relativedelta import relativedelta
+from collections import defaultdict
+
+# Kassa qalığına təsir edən sahələr
+LEDGER_FIELDS = {'date', 'amount', 'transaction_type', 'category', 'sport_type'}
+
+# Dashboard göstəricilərinin versiyası tranzaksiyada bir dəfə (commit-dən əvvəl) artırılır
+METRICS_VERSION_PENDING_KEY = 'volan_genclikk.cash_metrics_version_pending'
 
 class CashFlow(models.Model):
     _name = 'volan.cash.flow.genclik'
@@ -34,6 +44,11 @@ class CashFlow(models.Model):
     related_model = fields.Char('Əlaqəli Model', readonly=True)
     related_id = fields.Integer('Əlaqəli ID', readonly=True)
     has_source = fields.Boolean('Mənbə Sənəd Var', compute='_compute_has_source', store=False)
+
+    def init(self):
+        # Mənbə sənəd üzrə axtarış (silmə kaskadı) üçün
+        create_index(self.env.cr, 'volan_cash_flow_genclik_related_idx', self._table,
+                     ['related_model', 'related_id'], where='related_model IS NOT NULL')
     
     @api.depends('related_model', 'related_id')
     def _compute_has_source(self):
@@ -83,7 +98,33 @@ class CashFlow(models.Model):
                     f'⛔ Bu kassa əməliyyatı "{record.name}" bir sənəd tərəfindən yaradılıb!\n\n'
                     f'Silmək üçün əsas sənədi silməlisiniz.\n'
                 )
+        return self._unlink_moves()
+
+    def _unlink_moves(self):
+        """Yoxlamasız silmə: unlink-dən və mənbə sənəd silinəndə (kaskad) çağırılır"""
+        self.env['volan.cash.ledger.snapshot.genclik']._ledger_changed(self.mapped('date'))
+        self.env['badminton.cash.balance.genclik']._invalidate_metrics_cache()
         return super(CashFlow, self).unlink()
+
+    @api.model
+    def _get_for_sources(self, sources):
+        """Mənbə sənədlərin (eyni model) bütün kassa əməliyyatları - bir sorğu ilə"""
+        if not sources:
+            return self.browse()
+        return self.search([
+            ('related_model', '=', sources._name),
+            ('related_id', 'in', sources.ids),
+        ])
+
+    def write(self, vals):
+        """Məbləğ/tarix dəyişəndə kassa snapshotlarını yenilə"""
+        ledger_changed = bool(LEDGER_FIELDS & set(vals))
+        ledger_dates = self.mapped('date') if ledger_changed else []
+        res = super(CashFlow, self).write(vals)
+        if ledger_changed:
+            self.env['volan.cash.ledger.snapshot.genclik']._ledger_changed(ledger_dates + self.mapped('date'))
+            self.env['badminton.cash.balance.genclik']._invalidate_metrics_cache()
+        return res
     
     #@api.constrains('amount', 'transaction_type')
     #def _check_negative_balance(self):
@@ -97,20 +138,48 @@ class CashFlow(models.Model):
     #                                      'Cari balans: {:.2f}, Xərc məbləği: {:.2f}'.format(
     #                                              cash_balance.current_balance, record.amount))
 
-    @api.model
-    def create(self, vals):
+    @api.model_create_multi
+    def create(self, vals_list):
         """Yazarkən xərc üçün balans yoxlaması"""
         # Əvvəlcə yaratmadan xərc və məbləğ kontrolunu yoxlayaq
-        if vals.get('transaction_type') == 'expense':
-            amount = vals.get('amount', 0)
-            sport_type = vals.get('sport_type', 'general')
-            #if amount > 0:  # Məbləğ müsbət olarsa (xərclər üçün normal)
-            #    current_balance = self._get_current_balance_by_sport(sport_type)
-            #    if current_balance < amount:
-            #        raise ValidationError('Xəbərdarlıq: Yetərsiz balans! Bu xərc əməliyyatı balansı mənfiyə düşürəcək. '
-            #                              'Cari balans: {:.2f}, Xərc məbləği: {:.2f}'.format(
-            #                                  current_balance, amount))
-        return super(CashFlow, self).create(vals)
+        for vals in vals_list:
+            if vals.get('transaction_type') == 'expense':
+                amount = vals.get('amount', 0)
+                sport_type = vals.get('sport_type', 'general')
+                #if amount > 0:  # Məbləğ müsbət olarsa (xərclər üçün normal)
+                #    current_balance = self._get_current_balance_by_sport(sport_type)
+                #    if current_balance < amount:
+                #        raise ValidationError('Xəbərdarlıq: Yetərsiz balans! Bu xərc əməliyyatı balansı mənfiyə düşürəcək. '
+                #                              'Cari balans: {:.2f}, Xərc məbləği: {:.2f}'.format(
+                #                                  current_balance, amount))
+        records = super(CashFlow, self).create(vals_list)
+        self.env['volan.cash.ledger.snapshot.genclik']._ledger_changed(records.mapped('date'))
+        self.env['badminton.cash.balance.genclik']._invalidate_metrics_cache()
+        return records
+
+class CashMetricsVersion(models.Model):
+    """Dashboard göstəricilərinin məlumat versiyası (tək sətir)"""
+    _name = 'badminton.cash.metrics.version.genclik'
+    _description = 'Kassa Göstəriciləri Versiyası'
+    _log_access = False
+
+    version = fields.Integer(string="Versiya", required=True, default=0, readonly=True)
+
+    def init(self):
+        self.env.cr.execute(f"""
+            INSERT INTO {self._table} (id, version)
+            SELECT 1, 0 WHERE NOT EXISTS (SELECT 1 FROM {self._table})
+        """)
+
+    @api.model
+    def _get_version(self):
+        self.env.cr.execute(f"SELECT version FROM {self._table} WHERE id = 1")
+        row = self.env.cr.fetchone()
+        return row[0] if row else 0
+
+    @api.model
+    def _bump(self):
+        self.env.cr.execute(f"UPDATE {self._table} SET version = version + 1 WHERE id = 1")
 
 class BadmintonCashBalance(models.TransientModel):
     _name = 'badminton.cash.balance.genclik'
@@ -181,6 +250,30 @@ class BadmintonCashBalance(models.TransientModel):
         res.update(metrics)
         return res
 
+    # ---------- metrics cache ----------
+    @api.model
+    def _invalidate_metrics_cache(self):
+        """Göstəricilərin versiyasını yazan tranzaksiyanın sonunda bir dəfə artır.
+
+        Versiya məlumatla eyni tranzaksiyada commit olunur: oxuyan proses
+        versiyanı və məlumatı eyni snapshot-dan görür, buna görə köhnə nəticə
+        yeni versiya ilə keşlənə bilməz. Köhnə versiyaların keşi LRU ilə çıxır.
+        """
+        precommit = self.env.cr.precommit
+        if precommit.data.get(METRICS_VERSION_PENDING_KEY):
+            return
+        precommit.data[METRICS_VERSION_PENDING_KEY] = True
+        precommit.add(self.env['badminton.cash.metrics.version.genclik']._bump)
+
+    @api.model
+    @ormcache('date_filter', 'date_from', 'date_to', 'company_id', 'version')
+    def _get_cached_metrics(self, date_filter, date_from, date_to, company_id, version):
+        return self._compute_metrics(override={
+            'date_filter': date_filter,
+            'date_from': date_from,
+            'date_to': date_to,
+        })
+
     @api.depends('subscription_total_amount', 'delayed_payments_amount')
     def _compute_ontime_payments(self):
         """Gecikməyən ödənişləri hesabla: Abunəlik Ümumi - Gecikmiş Ödənişlər"""
@@ -274,56 +367,45 @@ class BadmintonCashBalance(models.TransientModel):
             'total_entries': 0,
         }
 
-    def _get_subscription_payment_sets(self, date_from, date_to):
-        """Seçilmiş interval üçün 3 dəst qaytarır:
+    def _get_subscription_payment_domains(self, date_from, date_to):
+        """Seçilmiş interval üçün 3 domen qaytarır:
         - timely: payment_date intervalda olanlar
         - delayed: real_date intervalda, payment_date isə AY-dan kənar olanlar
         - all_for_report: timely ∪ delayed  (reportda istifadə etdiyimiz)
         """
-        payment_obj = self.env['badminton.lesson.payment.genclik']
-
-        if not date_from or not date_to:
-            empty = payment_obj.browse([])
-            return {
-                'timely': empty,
-                'delayed': empty,
-                'all_for_report': empty,
-            }
-
         # 1️⃣ Intervalda payment_date
-        timely = payment_obj.search([
+        timely = [
             ('payment_date', '>=', date_from),
             ('payment_date', '<=', date_to),
-        ])
-
-        # 2️⃣ Intervalda real_date
-        payments_real = payment_obj.search([
-            ('real_date', '>=', date_from),
-            ('real_date', '<=', date_to),
-            ('real_date', '!=', False),
-        ])
+        ]
 
-        # 3️⃣ AY aralığını tap (date_from-un ayına görə)
+        # 2️⃣ AY aralığını tap (date_from-un ayına görə)
         month_start = date_from.replace(day=1)
         month_end = month_start + relativedelta(months=1, days=-1)
 
-        # 4️⃣ Gecikmiş: real_date intervalda, payment_date AY-dan kənardadır
-        delayed = payments_real.filtered(lambda p:
-            not p.payment_date or
-            p.payment_date < month_start or
-            p.payment_date > month_end
-        )
+        # 3️⃣ Gecikmiş: real_date intervalda, payment_date AY-dan kənardadır
+        delayed = [
+            ('real_date', '>=', date_from),
+            ('real_date', '<=', date_to),
+            ('real_date', '!=', False),
+            '|', '|',
+            ('payment_date', '=', False),
+            ('payment_date', '<', month_start),
+            ('payment_date', '>', month_end),
+        ]
 
-        # 5️⃣ Reportda istifadə etdiyimiz dəst:
+        # 4️⃣ Reportda istifadə etdiyimiz dəst:
         # payment_date intervalda OLANLAR + gecikmişlər
-        all_for_report = timely | delayed
-
         return {
             'timely': timely,
             'delayed': delayed,
-            'all_for_report': all_for_report,
+            'all_for_report': OR([timely, delayed]),
         }
 
+    def _sum_grouped(self, model_name, domain, groupby, measure):
+        """Bir GROUP BY sorğusu: {qrup dəyəri: cəm}"""
+        groups = self.env[model_name]._read_group(domain, groupby, [f'{measure}:sum'])
+        return {group[:-1] if len(groupby) > 1 else group[0]: group[-1] or 0.0 for group in groups}
 
     def _compute_delayed_payments(self, override=None):
         """
@@ -339,11 +421,10 @@ class BadmintonCashBalance(models.TransientModel):
         if not date_from or not date_to:
             return {'delayed_payments_amount': 0.0}
 
-        sets = self._get_subscription_payment_sets(date_from, date_to)
-        delayed_payments = sets['delayed']
-
-        delayed_amount = sum(delayed_payments.mapped('amount'))
-        return {'delayed_payments_amount': delayed_amount}
+        domains = self._get_subscription_payment_domains(date_from, date_to)
+        [(delayed_amount,)] = self.env['badminton.lesson.payment.genclik']._read_group(
+            domains['delayed'], [], ['amount:sum'])
+        return {'delayed_payments_amount': delayed_amount or 0.0}
 
 
     def _compute_subscription_metrics(self, override=None):
@@ -355,16 +436,11 @@ class BadmintonCashBalance(models.TransientModel):
         if not date_from or not date_to:
             return self._empty_subscription_metrics()
 
-        sets = self._get_subscription_payment_sets(date_from, date_to)
-        all_payments = sets['all_for_report']
-
-        cash_amount = sum(all_payments.filtered(
-            lambda p: p.payment_method_lesson == 'cash'
-        ).mapped('amount'))
-
-        card_amount = sum(all_payments.filtered(
-            lambda p: p.payment_method_lesson == 'card'
-        ).mapped('amount'))
+        domains = self._get_subscription_payment_domains(date_from, date_to)
+        by_method = self._sum_grouped('badminton.lesson.payment.genclik', domains['all_for_report'],
+                                      ['payment_method_lesson'], 'amount')
+        cash_amount = by_method.get('cash', 0.0)
+        card_amount = by_method.get('card', 0.0)
 
         total_amount = cash_amount + card_amount
 
@@ -395,12 +471,11 @@ class BadmintonCashBalance(models.TransientModel):
         if not date_from or not date_to:
             return self._empty_sale_metrics()
 
-        sale_obj = self.env['badminton.sale.genclik']
-        sales = sale_obj.search(self._build_sale_domain(date_from, date_to))
-
-        cash_amount = sum(sales.filtered(lambda s: s.payment_method == 'cash').mapped('amount_paid'))
-        card_amount = sum(sales.filtered(lambda s: s.payment_method == 'card').mapped('amount_paid'))
-        abonent_amount = sum(sales.filtered(lambda s: s.payment_method == 'abonent').mapped('amount_paid'))
+        by_method = self._sum_grouped('badminton.sale.genclik', self._build_sale_domain(date_from, date_to),
+                                      ['payment_method'], 'amount_paid')
+        cash_amount = by_method.get('cash', 0.0)
+        card_amount = by_method.get('card', 0.0)
+        abonent_amount = by_method.get('abonent', 0.0)
         total_amount = cash_amount + card_amount + abonent_amount
 
         return {
@@ -428,20 +503,10 @@ class BadmintonCashBalance(models.TransientModel):
         if not date_from or not date_to:
             return self._empty_other_metrics()
 
-        cash_flow_obj = self.env['volan.cash.flow.genclik']
-        base_domain = self._build_cash_flow_domain(date_from, date_to)
-
-        income_domain = base_domain + [
-            ('transaction_type', '=', 'income'),
-            ('category', '=', 'other'),
-        ]
-        expense_domain = base_domain + [
-            ('transaction_type', '=', 'expense'),
-            ('category', '=', 'other'),
-        ]
-
-        income_amount = sum(cash_flow_obj.search(income_domain).mapped('amount'))
-        expense_amount = sum(cash_flow_obj.search(expense_domain).mapped('amount'))
+        domain = self._build_cash_flow_domain(date_from, date_to) + [('category', '=', 'other')]
+        by_type = self._sum_grouped('volan.cash.flow.genclik', domain, ['transaction_type'], 'amount')
+        income_amount = by_type.get('income', 0.0)
+        expense_amount = by_type.get('expense', 0.0)
         net_amount = income_amount - expense_amount
 
         return {
@@ -453,24 +518,18 @@ class BadmintonCashBalance(models.TransientModel):
     def _compute_child_metrics(self, override=None):
         lesson_obj = self.env['badminton.lesson.simple.genclik']
         # Yalnız aktiv abunəlikləri say
-        all_lessons = lesson_obj.search([('state', '=', 'active')])
-        total_children = len(set(all_lessons.mapped('partner_id').ids))
+        total_children = len(lesson_obj._read_group([('state', '=', 'active')], ['partner_id']))
 
         state = self._resolve_filter_state(override)
         date_from, date_to = self._get_date_range(state)
 
         new_children = 0
         if date_from and date_to:
-            lessons_in_range = lesson_obj.search([
-                ('payment_date', '>=', date_from),
-                ('payment_date', '<=', date_to),
+            # İlk abunəliyi bu intervala düşən müştərilər
+            new_children = self.env['res.partner'].sudo().with_context(active_test=False).search_count([
+                ('first_lesson_date', '>=', date_from),
+                ('first_lesson_date', '<=', date_to),
             ])
-            range_partners = set(lessons_in_range.mapped('partner_id').ids)
-            earlier_partners = set()
-            if date_from:
-                earlier_lessons = lesson_obj.search([('payment_date', '<', date_from)])
-                earlier_partners = set(earlier_lessons.mapped('partner_id').ids)
-            new_children = len(range_partners - earlier_partners)
 
         return {
             'total_children_count': total_children,
@@ -486,23 +545,21 @@ class BadmintonCashBalance(models.TransientModel):
         if not date_from or not date_to:
             return self._empty_entry_metrics()
 
-        session_obj = self.env['badminton.session.genclik']
-        session_domain = [('state', '=', 'completed')]
-        start_dt = datetime.combine(date_from, datetime.min.time())
-        end_dt = datetime.combine(date_to, datetime.max.time())
-        session_domain += [
-            ('start_time', '>=', start_dt),
-            ('start_time', '<=', end_dt),
-        ]
-        sessions = session_obj.search(session_domain)
-
-        cash_entries = len(sessions.filtered(lambda s: s.payment_type == 'cash'))
-        card_entries = len(sessions.filtered(lambda s: s.payment_type == 'card'))
-        abonent_entries = len(sessions.filtered(lambda s: s.payment_type == 'abonent'))
-        onefit_entries = len(sessions.filtered(lambda s: s.promo_type == '1fit'))
-        push30_entries = len(sessions.filtered(lambda s: s.promo_type == 'push30'))
-        push30_plus_entries = len(sessions.filtered(lambda s: s.promo_type == 'push30_plus'))
-        tripsome_entries = len(sessions.filtered(lambda s: s.promo_type == 'tripsome'))
+        stats = self.env['badminton.session.genclik']._get_entry_statistics(
+            date_from, date_to, groupby=('payment_type', 'promo_type'))
+        by_payment = defaultdict(int)
+        by_promo = defaultdict(int)
+        for (payment_type, promo_type), count in stats.items():
+            by_payment[payment_type] += count
+            by_promo[promo_type] += count
+
+        cash_entries = by_payment['cash']
+        card_entries = by_payment['card']
+        abonent_entries = by_payment['abonent']
+        onefit_entries = by_promo['1fit']
+        push30_entries = by_promo['push30']
+        push30_plus_entries = by_promo['push30_plus']
+        tripsome_entries = by_promo['tripsome']
         total_entries = onefit_entries + push30_entries + push30_plus_entries + tripsome_entries
 
         return {
@@ -530,44 +587,11 @@ class BadmintonCashBalance(models.TransientModel):
         }
 
     def _compute_all_time_overall_total(self, date_to):
-        """Ümumi Qalıq dəyərini 0-cı ildən seçilmiş tarix aralığının sonuna qədər hesablayır."""
-        payment_obj = self.env['badminton.lesson.payment.genclik']
-        
-        # payment_date və ya real_date seçilmiş tarix aralığının sonuna qədər olan ödənişlər
-        payment_date_payments = payment_obj.search([('payment_date', '<=', date_to)])
-        real_date_payments = payment_obj.search([
-            ('real_date', '<=', date_to),
-            ('real_date', '!=', False)
-        ])
-        all_payments = payment_date_payments | real_date_payments
-        
-        subscription_cash = sum(all_payments.filtered(lambda p: p.payment_method_lesson == 'cash').mapped('amount'))
-        subscription_card = sum(all_payments.filtered(lambda p: p.payment_method_lesson == 'card').mapped('amount'))
-
-        sale_obj = self.env['badminton.sale.genclik']
-        end_dt = datetime.combine(date_to, datetime.max.time())
-        sales = sale_obj.search([('state', '=', 'paid'), ('payment_date', '<=', end_dt)])
-        sale_cash = sum(sales.filtered(lambda s: s.payment_method == 'cash').mapped('amount_paid'))
-        sale_card = sum(sales.filtered(lambda s: s.payment_method == 'card').mapped('amount_paid'))
-        sale_abonent = sum(sales.filtered(lambda s: s.payment_method == 'abonent').mapped('amount_paid'))
-
-        cash_flow_obj = self.env['volan.cash.flow.genclik']
-        other_income = sum(cash_flow_obj.search([
-            ('sport_type', '=', 'badminton'),
-            ('category', '=', 'other'),
-            ('transaction_type', '=', 'income'),
-            ('date', '<=', date_to),
-        ]).mapped('amount'))
-
-        # Xərcləri çıxırıq
-        other_expense = sum(cash_flow_obj.search([
-            ('sport_type', '=', 'badminton'),
-            ('transaction_type', '=', 'expense'),
-            ('date', '<=', date_to),
-        ]).mapped('amount'))
+        """Ümumi Qalıq dəyərini 0-cı ildən seçilmiş tarix aralığının sonuna qədər hesablayır.
 
-        return (subscription_cash + subscription_card +
-                sale_cash + sale_card + sale_abonent + other_income - other_expense)
+        Ən yaxın gün sonu snapshotu + ondan sonrakı günlərin hərəkətləri.
+        """
+        return self.env['volan.cash.ledger.snapshot.genclik']._get_closing_balance(date_to)
 
     def _compute_cashbox_metrics(self, metrics, override=None):
         state = self._resolve_filter_state(override)
@@ -604,6 +628,18 @@ class BadmintonCashBalance(models.TransientModel):
         }
 
     def _gather_metrics(self, override=None):
+        state = self._resolve_filter_state(override)
+        metrics = self._get_cached_metrics(
+            state['date_filter'],
+            fields.Date.to_date(state['date_from']),
+            fields.Date.to_date(state['date_to']),
+            self.env.company.id,
+            self.env['badminton.cash.metrics.version.genclik']._get_version(),
+        )
+        # Keşdəki lüğəti dəyişməmək üçün surətini qaytar
+        return dict(metrics)
+
+    def _compute_metrics(self, override=None):
         metrics = {}
         metrics.update(self._compute_subscription_metrics(override=override))
         metrics.update(self._compute_badminton_sale_metrics(override=override))
@@ -621,6 +657,42 @@ class BadmintonCashBalance(models.TransientModel):
         self.write(metrics)
         return {'type': 'ir.actions.client', 'tag': 'reload'}
 
+    def action_close_cash_day(self):
+        """Seçilmiş son günü bağla və Z-hesabatı aç (bu gün hələ açıq olduğu üçün ən gec dünən)"""
+        date_from, date_to = self._ensure_one_and_get_range()
+        yesterday = fields.Date.context_today(self) - timedelta(days=1)
+        closing = self.env['volan.cash.closing.genclik']._close_day(min(date_to or yesterday, yesterday))
+        return {
+            'type': 'ir.actions.act_window',
+            'name': 'Z-Hesabat',
+            'res_model': 'volan.cash.closing.genclik',
+            'res_id': closing.id,
+            'view_mode': 'form',
+            'target': 'current',
+        }
+
+    def action_export_ledger_csv(self):
+        return self._export_ledger('csv')
+
+    def action_export_ledger_xlsx(self):
+        return self._export_ledger('xlsx')
+
+    def _export_ledger(self, file_format):
+        """Seçilmiş aralığın kassa hərəkətlərini fayl kimi yüklə (controller axınla yazır)"""
+        date_from, date_to = self._ensure_one_and_get_range()
+        if not date_from or not date_to:
+            raise ValidationError('İxrac üçün tarix aralığını seçin!')
+        params = urlencode({
+            'date_from': fields.Date.to_string(date_from),
+            'date_to': fields.Date.to_string(date_to),
+            'file_format': file_format,
+        })
+        return {
+            'type': 'ir.actions.act_url',
+            'url': f'/volan_genclikk/cash/export?{params}',
+            'target': 'self',
+        }
+
     @api.onchange('date_filter', 'date_from', 'date_to')
     def _onchange_date_filter(self):
         state = self._resolve_filter_state()
@@ -702,50 +774,48 @@ class BadmintonCashBalance(models.TransientModel):
         }
 
     # ---------------- 1) Abunəlik (badminton.lesson.payment) ----------------
-    def action_view_subscription_cash(self):
+    def _subscription_domain(self, key, extra=None):
         date_from, date_to = self._ensure_one_and_get_range()
-        sets = self._get_subscription_payment_sets(date_from, date_to)
-        payments = sets["all_for_report"].filtered(lambda p: p.payment_method_lesson == "cash")
-        return self._act_window("Abunəlik Nağd Ödənişləri", "badminton.lesson.payment.genclik", [("id", "in", payments.ids)])
+        if not date_from or not date_to:
+            return FALSE_DOMAIN
+        return self._get_subscription_payment_domains(date_from, date_to)[key] + (extra or [])
+
+    def action_view_subscription_cash(self):
+        domain = self._subscription_domain("all_for_report", [("payment_method_lesson", "=", "cash")])
+        return self._act_window("Abunəlik Nağd Ödənişləri", "badminton.lesson.payment.genclik", domain)
 
     def action_view_subscription_card(self):
-        date_from, date_to = self._ensure_one_and_get_range()
-        sets = self._get_subscription_payment_sets(date_from, date_to)
-        payments = sets["all_for_report"].filtered(lambda p: p.payment_method_lesson == "card")
-        return self._act_window("Abunəlik Kart Ödənişləri", "badminton.lesson.payment.genclik", [("id", "in", payments.ids)])
+        domain = self._subscription_domain("all_for_report", [("payment_method_lesson", "=", "card")])
+        return self._act_window("Abunəlik Kart Ödənişləri", "badminton.lesson.payment.genclik", domain)
 
     def action_view_subscription_total(self):
-        date_from, date_to = self._ensure_one_and_get_range()
-        sets = self._get_subscription_payment_sets(date_from, date_to)
-        payments = sets["all_for_report"]
-        return self._act_window("Abunəlik Ödənişləri (Ümumi)", "badminton.lesson.payment.genclik", [("id", "in", payments.ids)])
+        domain = self._subscription_domain("all_for_report")
+        return self._act_window("Abunəlik Ödənişləri (Ümumi)", "badminton.lesson.payment.genclik", domain)
 
     def action_view_delayed_payments(self):
-        date_from, date_to = self._ensure_one_and_get_range()
-        sets = self._get_subscription_payment_sets(date_from, date_to)
-        payments = sets["delayed"]
-        return self._act_window("Gecikmiş Ödənişlər", "badminton.lesson.payment.genclik", [("id", "in", payments.ids)])
+        domain = self._subscription_domain("delayed")
+        return self._act_window("Gecikmiş Ödənişlər", "badminton.lesson.payment.genclik", domain)
 
     # ---------------- 2) Badminton Satışı (badminton.sale) ----------------
     def action_view_badminton_sale_cash(self):
         date_from, date_to = self._ensure_one_and_get_range()
-        sales = self.env["badminton.sale.genclik"].search(self._build_sale_domain(date_from, date_to) + [("payment_method", "=", "cash")])
-        return self._act_window("Badminton Satışı (Nağd)", "badminton.sale.genclik", [("id", "in", sales.ids)])
+        domain = self._build_sale_domain(date_from, date_to) + [("payment_method", "=", "cash")]
+        return self._act_window("Badminton Satışı (Nağd)", "badminton.sale.genclik", domain)
 
     def action_view_badminton_sale_card(self):
         date_from, date_to = self._ensure_one_and_get_range()
-        sales = self.env["badminton.sale.genclik"].search(self._build_sale_domain(date_from, date_to) + [("payment_method", "=", "card")])
-        return self._act_window("Badminton Satışı (Kart)", "badminton.sale.genclik", [("id", "in", sales.ids)])
+        domain = self._build_sale_domain(date_from, date_to) + [("payment_method", "=", "card")]
+        return self._act_window("Badminton Satışı (Kart)", "badminton.sale.genclik", domain)
 
     def action_view_badminton_sale_abonent(self):
         date_from, date_to = self._ensure_one_and_get_range()
-        sales = self.env["badminton.sale.genclik"].search(self._build_sale_domain(date_from, date_to) + [("payment_method", "=", "abonent")])
-        return self._act_window("Badminton Satışı (Abunəçi)", "badminton.sale.genclik", [("id", "in", sales.ids)])
+        domain = self._build_sale_domain(date_from, date_to) + [("payment_method", "=", "abonent")]
+        return self._act_window("Badminton Satışı (Abunəçi)", "badminton.sale.genclik", domain)
 
     def action_view_badminton_sale_total(self):
         date_from, date_to = self._ensure_one_and_get_range()
-        sales = self.env["badminton.sale.genclik"].search(self._build_sale_domain(date_from, date_to))
-        return self._act_window("Badminton Satışı (Ümumi)", "badminton.sale.genclik", [("id", "in", sales.ids)])
+        domain = self._build_sale_domain(date_from, date_to)
+        return self._act_window("Badminton Satışı (Ümumi)", "badminton.sale.genclik", domain)
 
     # ---------------- 3) Digər Mədaxil/Məxaric (volan.cash.flow) ----------------
     def action_view_other_income(self):
@@ -770,52 +840,41 @@ class BadmintonCashBalance(models.TransientModel):
         return self._act_window("Digər Axınlar (Net detalları)", "volan.cash.flow.genclik", domain, context={"default_sport_type": "badminton"})
 
     # ---------------- 4) Giriş Hesabatı (badminton.session) ----------------
-    def _sessions_in_range(self, date_from, date_to):
-        start_dt = datetime.combine(date_from, datetime.min.time())
-        end_dt = datetime.combine(date_to, datetime.max.time())
-        return self.env["badminton.session.genclik"].search([
-            ("state", "=", "completed"),
-            ("start_time", ">=", start_dt),
-            ("start_time", "<=", end_dt),
-        ])
+    def _session_domain(self, extra=None):
+        date_from, date_to = self._ensure_one_and_get_range()
+        if not date_from or not date_to:
+            return FALSE_DOMAIN
+        return self.env["badminton.session.genclik"]._get_entry_domain(date_from, date_to) + (extra or [])
 
     def action_view_entries_cash(self):
-        date_from, date_to = self._ensure_one_and_get_range()
-        sessions = self._sessions_in_range(date_from, date_to).filtered(lambda s: s.payment_type == "cash")
-        return self._act_window("Girişlər (Nağd)", "badminton.session.genclik", [("id", "in", sessions.ids)])
+        domain = self._session_domain([("payment_type", "=", "cash")])
+        return self._act_window("Girişlər (Nağd)", "badminton.session.genclik", domain)
 
     def action_view_entries_card(self):
-        date_from, date_to = self._ensure_one_and_get_range()
-        sessions = self._sessions_in_range(date_from, date_to).filtered(lambda s: s.payment_type == "card")
-        return self._act_window("Girişlər (Card to card)", "badminton.session.genclik", [("id", "in", sessions.ids)])
+        domain = self._session_domain([("payment_type", "=", "card")])
+        return self._act_window("Girişlər (Card to card)", "badminton.session.genclik", domain)
 
     def action_view_entries_abonent(self):
-        date_from, date_to = self._ensure_one_and_get_range()
-        sessions = self._sessions_in_range(date_from, date_to).filtered(lambda s: s.payment_type == "abonent")
-        return self._act_window("Girişlər (Abunəçi)", "badminton.session.genclik", [("id", "in", sessions.ids)])
+        domain = self._session_domain([("payment_type", "=", "abonent")])
+        return self._act_window("Girişlər (Abunəçi)", "badminton.session.genclik", domain)
 
     # ---------------- 5) Tətbiq Hesabatı (badminton.session promo_type) ----------------
     def action_view_app_onefit(self):
-        date_from, date_to = self._ensure_one_and_get_range()
-        sessions = self._sessions_in_range(date_from, date_to).filtered(lambda s: s.promo_type == "1fit")
-        return self._act_window("Tətbiq Girişləri (1FIT)", "badminton.session.genclik", [("id", "in", sessions.ids)])
+        domain = self._session_domain([("promo_type", "=", "1fit")])
+        return self._act_window("Tətbiq Girişləri (1FIT)", "badminton.session.genclik", domain)
 
     def action_view_app_push30(self):
-        date_from, date_to = self._ensure_one_and_get_range()
-        sessions = self._sessions_in_range(date_from, date_to).filtered(lambda s: s.promo_type == "push30")
-        return self._act_window("Tətbiq Girişləri (PUSH30)", "badminton.session.genclik", [("id", "in", sessions.ids)])
+        domain = self._session_domain([("promo_type", "=", "push30")])
+        return self._act_window("Tətbiq Girişləri (PUSH30)", "badminton.session.genclik", domain)
 
     def action_view_app_push30_plus(self):
-        date_from, date_to = self._ensure_one_and_get_range()
-        sessions = self._sessions_in_range(date_from, date_to).filtered(lambda s: s.promo_type == "push30_plus")
-        return self._act_window("Tətbiq Girişləri (PUSH30+)", "badminton.session.genclik", [("id", "in", sessions.ids)])
+        domain = self._session_domain([("promo_type", "=", "push30_plus")])
+        return self._act_window("Tətbiq Girişləri (PUSH30+)", "badminton.session.genclik", domain)
 
     def action_view_app_tripsome(self):
-        date_from, date_to = self._ensure_one_and_get_range()
-        sessions = self._sessions_in_range(date_from, date_to).filtered(lambda s: s.promo_type == "tripsome")
-        return self._act_window("Tətbiq Girişləri (Tripsome)", "badminton.session.genclik", [("id", "in", sessions.ids)])
+        domain = self._session_domain([("promo_type", "=", "tripsome")])
+        return self._act_window("Tətbiq Girişləri (Tripsome)", "badminton.session.genclik", domain)
 
     def action_view_entries_total(self):
-        date_from, date_to = self._ensure_one_and_get_range()
-        sessions = self._sessions_in_range(date_from, date_to)
-        return self._act_window("Girişlər (Ümumi)", "badminton.session.genclik", [("id", "in", sessions.ids)])
+        domain = self._session_domain()
+        return self._act_window("Girişlər (Ümumi)", "badminton.session.genclik", domain)
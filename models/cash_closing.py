@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+from odoo import models, fields, api
+from odoo.exceptions import ValidationError
+from odoo.addons.base.models.ir_model import MODULE_UNINSTALL_FLAG
+from datetime import timedelta
+from .cash_ledger_snapshot import LEDGER_MOVES_SQL
+import logging
+
+_logger = logging.getLogger(__name__)
+
+# Cron dünənə qədər son bu qədər gün içində bağlanmamış günləri bağlayır
+MAX_CATCHUP_DAYS = 31
+
+CLOSING_CATEGORIES = [
+    ('lesson', 'Abunəlik'),
+    ('sale', 'Satış'),
+    ('other', 'Digər Mədaxil'),
+    ('expense', 'Məxaric'),
+]
+CLOSING_PAYMENT_METHODS = [
+    ('cash', 'Nağd'),
+    ('card', 'Kart'),
+    ('abonent', 'Abunəçi'),
+    ('none', 'Təyin edilməyib'),
+]
+# Hər Z-hesabatda sıfır olsa belə yaradılan sətirlər (sonrakı düzəlişlər də fərqdə görünsün)
+CLOSING_LINE_KEYS = [
+    ('lesson', 'cash'),
+    ('lesson', 'card'),
+    ('sale', 'cash'),
+    ('sale', 'card'),
+    ('sale', 'abonent'),
+    ('other', 'none'),
+    ('expense', 'none'),
+]
+
+
+class CashClosing(models.Model):
+    """Gün sonu Z-hesabatı.
+
+    Bağlanış anında günün hərəkətləri kateqoriya və ödəniş metodu üzrə
+    dondurulur və sonradan dəyişdirilə və ya silinə bilməz. Sətirlərdə
+    dondurulmuş dəyərlər cari (canlı) dəyərlərlə müqayisə olunur ki, sonradan
+    edilən düzəlişlər görünsün.
+    """
+    _name = 'volan.cash.closing.genclik'
+    _description = 'Kassa Gün Sonu (Z-Hesabat)'
+    _order = 'date desc'
+    _sql_constraints = [
+        ('date_sport_unique', 'UNIQUE(date, sport_type)', 'Bu gün artıq bağlanıb!')
+    ]
+
+    name = fields.Char(string="Ad", compute='_compute_name')
+    date = fields.Date(string="Tarix", required=True, readonly=True, index=True)
+    sport_type = fields.Selection([
+        ('badminton', 'Badminton'),
+        ('basketball', 'Basketbol'),
+        ('general', 'Ümumi')
+    ], string="İdman Növü", required=True, default='badminton', readonly=True)
+    closed_at = fields.Datetime(string="Bağlanma Vaxtı", required=True, readonly=True, default=fields.Datetime.now)
+    closed_by = fields.Many2one('res.users', string="Bağlayan", required=True, readonly=True,
+                                default=lambda self: self.env.user)
+    line_ids = fields.One2many('volan.cash.closing.line.genclik', 'closing_id', string="Sətirlər", readonly=True)
+
+    total_amount = fields.Float(string="Günün Net Nəticəsi", readonly=True)
+    closing_balance = fields.Float(string="Gün Sonu Qalığı", readonly=True)
+
+    live_total_amount = fields.Float(string="Cari Net Nəticə", compute='_compute_live_totals')
+    diff_amount = fields.Float(string="Fərq", compute='_compute_live_totals')
+    has_diff = fields.Boolean(string="Fərq Var", compute='_compute_live_totals')
+
+    @api.depends('date', 'sport_type')
+    def _compute_name(self):
+        for closing in self:
+            closing.name = f"Z-{closing.date}" if closing.date else 'Z'
+
+    @api.depends('line_ids.live_amount')
+    def _compute_live_totals(self):
+        for closing in self:
+            closing.live_total_amount = sum(closing.line_ids.mapped('live_amount'))
+            closing.diff_amount = closing.live_total_amount - closing.total_amount
+            closing.has_diff = any(closing.line_ids.mapped('has_diff'))
+
+    def write(self, vals):
+        raise ValidationError('⛔ Z-hesabat bağlandıqdan sonra dəyişdirilə bilməz!')
+
+    def unlink(self):
+        if not self.env.context.get(MODULE_UNINSTALL_FLAG):
+            raise ValidationError('⛔ Z-hesabat silinə bilməz!')
+        return super().unlink()
+
+    # ---------- closing ----------
+    @api.model
+    def _get_day_totals(self, dates, sport_type='badminton'):
+        """Günlər üzrə cari hərəkətlər: {(gün, kateqoriya, metod): (məbləğ, say)} - bir sorğu ilə"""
+        if not dates:
+            return {}
+        self.env['volan.cash.ledger.snapshot.genclik']._flush_ledger_sources()
+        self.env.cr.execute(f"""
+            SELECT day, category, payment_method, SUM(amount), COUNT(*)
+              FROM ({LEDGER_MOVES_SQL}) moves
+             WHERE sport_type = %s AND day = ANY(%s)
+          GROUP BY day, category, payment_method
+        """, (sport_type, list(dates)))
+        return {(day, category, method): (amount, count)
+                for day, category, method, amount, count in self.env.cr.fetchall()}
+
+    @api.model
+    def _close_day(self, date, sport_type='badminton'):
+        """Günü bağla; artıq bağlanıbsa mövcud Z-hesabatı qaytar"""
+        existing = self.search([('date', '=', date), ('sport_type', '=', sport_type)], limit=1)
+        if existing:
+            return existing
+        if date >= fields.Date.context_today(self):
+            raise ValidationError('Yalnız keçmiş günlər bağlana bilər - bu gün hələ açıqdır!')
+
+        totals = self._get_day_totals([date], sport_type)
+        lines = []
+        for category, method in CLOSING_LINE_KEYS:
+            amount, count = totals.get((date, category, method), (0.0, 0))
+            lines.append((0, 0, {
+                'category': category,
+                'payment_method': method,
+                'frozen_amount': amount,
+                'frozen_count': count,
+            }))
+        closing = self.create({
+            'date': date,
+            'sport_type': sport_type,
+            'line_ids': lines,
+            'total_amount': sum(amount for amount, _count in totals.values()),
+            'closing_balance': self.env['volan.cash.ledger.snapshot.genclik']._get_closing_balance(date, sport_type),
+        })
+        _logger.info("Cash closing %s created (%s lines).", closing.name, len(lines))
+        return closing
+
+    @api.model
+    def _cron_close_days(self):
+        """Son MAX_CATCHUP_DAYS gündə (dünən daxil) bağlanmamış bütün günləri bağla.
+
+        Əl ilə bağlanmış günlər arasında qalan boşluqlar da bağlanır.
+        """
+        yesterday = fields.Date.context_today(self) - timedelta(days=1)
+        start = yesterday - timedelta(days=MAX_CATCHUP_DAYS - 1)
+        closed = set(self.search([
+            ('sport_type', '=', 'badminton'),
+            ('date', '>=', start),
+            ('date', '<=', yesterday),
+        ]).mapped('date'))
+        for offset in range(MAX_CATCHUP_DAYS):
+            day = start + timedelta(days=offset)
+            if day not in closed:
+                self._close_day(day)
+
+    def action_view_lines(self):
+        self.ensure_one()
+        return {
+            'type': 'ir.actions.act_window',
+            'name': f'{self.name} - Canlı ilə Müqayisə',
+            'res_model': 'volan.cash.closing.line.genclik',
+            'view_mode': 'list',
+            'domain': [('closing_id', '=', self.id)],
+            'target': 'current',
+        }
+
+
+class CashClosingLine(models.Model):
+    _name = 'volan.cash.closing.line.genclik'
+    _description = 'Kassa Gün Sonu Sətri'
+    _order = 'closing_id, category, payment_method'
+
+    closing_id = fields.Many2one('volan.cash.closing.genclik', string="Z-Hesabat", required=True,
+                                 ondelete='cascade', index=True, readonly=True)
+    date = fields.Date(related='closing_id.date', string="Tarix")
+    category = fields.Selection(CLOSING_CATEGORIES, string="Kateqoriya", required=True, readonly=True)
+    payment_method = fields.Selection(CLOSING_PAYMENT_METHODS, string="Ödəniş Metodu", required=True, readonly=True)
+    frozen_amount = fields.Float(string="Bağlanışda Məbləğ", readonly=True)
+    frozen_count = fields.Integer(string="Bağlanışda Say", readonly=True)
+
+    live_amount = fields.Float(string="Cari Məbləğ", compute='_compute_live')
+    live_count = fields.Integer(string="Cari Say", compute='_compute_live')
+    diff_amount = fields.Float(string="Fərq", compute='_compute_live')
+    has_diff = fields.Boolean(string="Fərq Var", compute='_compute_live')
+
+    def _compute_live(self):
+        # Bütün sətirlərin günləri üçün bir sorğu
+        totals_by_sport = {}
+        for sport_type in set(self.mapped('closing_id.sport_type')):
+            lines = self.filtered(lambda l: l.closing_id.sport_type == sport_type)
+            totals_by_sport[sport_type] = self.env['volan.cash.closing.genclik']._get_day_totals(
+                set(lines.mapped('closing_id.date')), sport_type)
+        for line in self:
+            totals = totals_by_sport.get(line.closing_id.sport_type, {})
+            amount, count = totals.get((line.closing_id.date, line.category, line.payment_method), (0.0, 0))
+            line.live_amount = amount
+            line.live_count = count
+            line.diff_amount = amount - line.frozen_amount
+            line.has_diff = bool(round(line.diff_amount, 2)) or count != line.frozen_count
+
+    def write(self, vals):
+        raise ValidationError('⛔ Z-hesabat sətirləri dəyişdirilə bilməz!')
+
+    def unlink(self):
+        if not self.env.context.get(MODULE_UNINSTALL_FLAG):
+            raise ValidationError('⛔ Z-hesabat sətirləri silinə bilməz!')
+        return super().unlink()
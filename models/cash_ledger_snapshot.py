@@ -0,0 +1,195 @@
+# -*- coding: utf-8 -*-
+from odoo import models, fields, api
+from odoo.tools.sql import create_index
+import logging
+
+_logger = logging.getLogger(__name__)
+
+# Kassa qalığına düşən bütün hərəkətlər (idman növü, gün, kateqoriya, ödəniş metodu, məbləğ).
+# Abunəlik ödənişi payment_date və real_date-dən hansı daha tezdirsə, o gün kassaya düşür.
+# Xərclər mənfi işarə ilə gəlir ki, cəm birbaşa qalıq dəyişikliyi olsun.
+LEDGER_MOVES_SQL = """
+    SELECT 'badminton' AS sport_type, LEAST(payment_date, real_date) AS day,
+           'lesson' AS category, payment_method_lesson AS payment_method, amount
+      FROM badminton_lesson_payment_genclik
+     WHERE payment_method_lesson IN ('cash', 'card')
+    UNION ALL
+    SELECT 'badminton', payment_date::date, 'sale', payment_method, amount_paid
+      FROM badminton_sale_genclik
+     WHERE state = 'paid'
+       AND payment_method IN ('cash', 'card', 'abonent')
+       AND payment_date IS NOT NULL
+    UNION ALL
+    SELECT sport_type, date,
+           CASE WHEN transaction_type = 'expense' THEN 'expense' ELSE 'other' END,
+           'none',
+           CASE WHEN transaction_type = 'expense' THEN -amount ELSE amount END
+      FROM volan_cash_flow_genclik
+     WHERE transaction_type = 'expense' OR category = 'other'
+"""
+
+# Snapshot yazan və silən tranzaksiyaları ardıcıllaşdıran advisory kilid
+LEDGER_LOCK_KEY = 0x566F6C61  # 'Vola'
+SNAPSHOT_PENDING_KEY = 'volan_genclikk.ledger_snapshot_pending'
+INVALIDATE_PENDING_KEY = 'volan_genclikk.ledger_invalidate_pending'
+
+
+class CashLedgerSnapshot(models.Model):
+    """Gün sonu kassa qalığı.
+
+    Qalıq hesablananda ən yaxın əvvəlki snapshot götürülür və yalnız ondan
+    sonrakı günlərin hərəkətləri toplanır. Snapshot yalnız bugündən əvvəlki
+    günlər üçün saxlanılır; mənbə sənəd dəyişəndə həmin gündən sonrakı
+    snapshotlar silinir və növbəti sorğuda yenidən qurulur.
+
+    Snapshotlar oxuyan tranzaksiyada yazılmır: commit-dən sonra ayrıca
+    READ COMMITTED cursor-da, advisory kilid altında qurulur. Mənbə sənədi
+    dəyişən tranzaksiya da commit-dən sonra eyni kilid altında silməni
+    təkrarlayır, beləliklə paralel qurulmuş köhnə snapshot qalmır.
+    """
+    _name = 'volan.cash.ledger.snapshot.genclik'
+    _description = 'Kassa Gün Sonu Qalığı'
+    _order = 'date desc'
+    _sql_constraints = [
+        ('date_sport_unique', 'UNIQUE(date, sport_type)', 'Hər gün və idman növü üçün yalnız bir snapshot ola bilər!')
+    ]
+
+    date = fields.Date(string="Tarix", required=True, readonly=True)
+    sport_type = fields.Selection([
+        ('badminton', 'Badminton'),
+        ('basketball', 'Basketbol'),
+        ('general', 'Ümumi')
+    ], string="İdman Növü", required=True, default='badminton', readonly=True)
+    closing_balance = fields.Float(string="Gün Sonu Qalığı", readonly=True)
+
+    def init(self):
+        # LEDGER_MOVES_SQL-dəki gün ifadələri üzrə indekslər: qalıq "quyruğu" və
+        # gəlir kubu yalnız lazım olan tarix aralığını oxusun
+        cr = self.env.cr
+        create_index(cr, 'badminton_lesson_payment_genclik_ledger_day_idx',
+                     'badminton_lesson_payment_genclik', ['(LEAST(payment_date, real_date))'])
+        create_index(cr, 'badminton_sale_genclik_ledger_day_idx',
+                     'badminton_sale_genclik', ['((payment_date::date))'], where="state = 'paid'")
+        create_index(cr, 'volan_cash_flow_genclik_ledger_day_idx',
+                     'volan_cash_flow_genclik', ['sport_type', 'date'])
+
+    def _flush_ledger_sources(self):
+        for model_name in ('badminton.lesson.payment.genclik', 'badminton.sale.genclik', 'volan.cash.flow.genclik'):
+            self.env[model_name].flush_model()
+
+    @api.model
+    def _sum_ledger_moves(self, sport_type, after, until):
+        """(after, until] aralığındakı hərəkətlərin cəmi; after=None - əvvəldən"""
+        # Şərtlər birbaşa gün ifadələrinə düşür ki, indekslər istifadə olunsun
+        after_filter = "AND day > %(after)s" if after else ""
+        self.env.cr.execute(f"""
+            SELECT COALESCE(SUM(amount), 0)
+              FROM ({LEDGER_MOVES_SQL}) moves
+             WHERE sport_type = %(sport_type)s
+               AND day <= %(until)s
+               {after_filter}
+        """, {'sport_type': sport_type, 'after': after, 'until': until})
+        return self.env.cr.fetchone()[0]
+
+    @api.model
+    def _compute_closing_balance(self, date, sport_type):
+        """(snapshot günü, qalıq): ən yaxın snapshot + ondan sonrakı hərəkətlər"""
+        self.env.cr.execute("""
+            SELECT date, closing_balance
+              FROM volan_cash_ledger_snapshot_genclik
+             WHERE sport_type = %s AND date <= %s
+          ORDER BY date DESC
+             LIMIT 1
+        """, (sport_type, date))
+        base_date, balance = self.env.cr.fetchone() or (None, 0.0)
+        if base_date == date:
+            return base_date, balance
+        return base_date, balance + self._sum_ledger_moves(sport_type, base_date, date)
+
+    @api.model
+    def _get_closing_balance(self, date, sport_type='badminton'):
+        """Verilmiş günün sonundakı kassa qalığı"""
+        self._flush_ledger_sources()
+        base_date, balance = self._compute_closing_balance(date, sport_type)
+        # Bugünkü qalıq hələ dəyişə bilər - yalnız bağlanmış günləri saxla
+        if base_date != date and date < fields.Date.context_today(self):
+            self._schedule_snapshot(date, sport_type)
+        return balance
+
+    # ---------- kilid altında yazma ----------
+    @api.model
+    def _run_after_commit(self, key, item, method):
+        """``item``-i yığ və commit-dən sonra ``method(items)``-i yeni cursor-da bir dəfə işlət"""
+        postcommit = self.env.cr.postcommit
+        items = postcommit.data.get(key)
+        if items is None:
+            items = postcommit.data[key] = set()
+            registry, uid, model_name = self.env.registry, self.env.uid, self._name
+
+            @postcommit.add
+            def run_locked():
+                try:
+                    with registry.cursor() as cr:
+                        env = api.Environment(cr, uid, {})
+                        getattr(env[model_name]._lock_ledger(), method)(items)
+                except Exception:
+                    _logger.exception("Cash ledger snapshot maintenance (%s) failed.", method)
+        items.add(item)
+
+    @api.model
+    def _lock_ledger(self):
+        """Yeni tranzaksiyanın ilk addımı: hər sorğu son commit-ləri görsün və kilidi gözlə"""
+        self.env.cr.execute("SET TRANSACTION ISOLATION LEVEL READ COMMITTED")
+        self.env.cr.execute("SELECT pg_advisory_xact_lock(%s)", (LEDGER_LOCK_KEY,))
+        return self
+
+    @api.model
+    def _schedule_snapshot(self, date, sport_type):
+        self._run_after_commit(SNAPSHOT_PENDING_KEY, (date, sport_type), '_store_snapshots')
+
+    @api.model
+    def _store_snapshots(self, keys):
+        """Kilid altında snapshotları qur (tarix sırası ilə, növbəti əvvəlkindən istifadə etsin)"""
+        for date, sport_type in sorted(keys):
+            base_date, balance = self._compute_closing_balance(date, sport_type)
+            if base_date == date:
+                continue
+            self.env.cr.execute("""
+                INSERT INTO volan_cash_ledger_snapshot_genclik
+                       (date, sport_type, closing_balance, create_uid, create_date, write_uid, write_date)
+                VALUES (%(date)s, %(sport_type)s, %(balance)s, %(uid)s, NOW() AT TIME ZONE 'UTC', %(uid)s, NOW() AT TIME ZONE 'UTC')
+                ON CONFLICT (date, sport_type) DO UPDATE SET closing_balance = EXCLUDED.closing_balance
+            """, {'date': date, 'sport_type': sport_type, 'balance': balance, 'uid': self.env.uid})
+
+    @api.model
+    def _ledger_changed(self, dates):
+        """Kassa hərəkəti dəyişib: snapshotları sil, gəlir kubunda ayları yenilənməyə qeyd et"""
+        self._invalidate_from(dates)
+        self.env['volan.cash.revenue.cube.genclik']._mark_months_dirty(dates)
+
+    @api.model
+    def _invalidate_from(self, dates):
+        """Dəyişən ən erkən gündən başlayaraq snapshotları sil.
+
+        Silmə indi (bu tranzaksiyanın öz oxumaları üçün) və commit-dən sonra
+        kilid altında təkrar edilir: bu tranzaksiya ərzində paralel qurulmuş
+        snapshot dəyişikliyi görmədən yazılmış ola bilər.
+        """
+        dates = [date for date in dates if date]
+        if not dates:
+            return
+        self._delete_from(min(dates))
+        self._run_after_commit(INVALIDATE_PENDING_KEY, min(dates), '_delete_snapshots')
+
+    @api.model
+    def _delete_snapshots(self, dates):
+        self._delete_from(min(dates))
+
+    @api.model
+    def _delete_from(self, date):
+        self.env.cr.execute("""
+            DELETE FROM volan_cash_ledger_snapshot_genclik WHERE date >= %s
+        """, (date,))
+        if self.env.cr.rowcount:
+            _logger.debug("Cash ledger snapshots from %s invalidated (%s rows).", date, self.env.cr.rowcount)
+        self.invalidate_model()
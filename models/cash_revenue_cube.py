@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+from odoo import models, fields, api
+from dateutil.relativedelta import relativedelta
+from .cash_ledger_snapshot import LEDGER_MOVES_SQL
+import logging
+
+_logger = logging.getLogger(__name__)
+
+CUBE_PENDING_KEY = 'volan_genclikk.revenue_cube_pending_months'
+CUBE_CATEGORIES = ['lesson', 'sale', 'other', 'expense']
+
+
+class CashRevenueCube(models.Model):
+    """Aylıq gəlir kubu: ay × kateqoriya × ödəniş metodu × idman növü.
+
+    Kassa hərəkətləri (abunəlik ödənişləri, satışlar, digər mədaxil/məxaric)
+    aylar üzrə cəmlənib saxlanılır. Mənbə sənəd dəyişəndə təsirlənən aylar
+    tranzaksiyanın sonunda növbəyə yazılır və cron tərəfindən yenidən
+    hesablanır (yazan tranzaksiyalar kubun sətirlərinə toxunmur). Xərclər
+    mənfi işarə ilə saxlanılır, buna görə ayın cəmi kassa qalığının
+    dəyişməsinə bərabərdir.
+    """
+    _name = 'volan.cash.revenue.cube.genclik'
+    _description = 'Aylıq Gəlir Kubu'
+    _order = 'month desc, category, payment_method'
+    _sql_constraints = [
+        ('cell_unique', 'UNIQUE(month, category, payment_method, sport_type)',
+         'Kubun hər xanası yalnız bir dəfə ola bilər!')
+    ]
+
+    month = fields.Date(string="Ay", required=True, readonly=True, index=True)
+    category = fields.Selection([
+        ('lesson', 'Abunəlik'),
+        ('sale', 'Satış'),
+        ('other', 'Digər Mədaxil'),
+        ('expense', 'Məxaric'),
+    ], string="Kateqoriya", required=True, readonly=True)
+    payment_method = fields.Selection([
+        ('cash', 'Nağd'),
+        ('card', 'Kart'),
+        ('abonent', 'Abunəçi'),
+        ('none', 'Təyin edilməyib'),
+    ], string="Ödəniş Metodu", required=True, readonly=True)
+    sport_type = fields.Selection([
+        ('badminton', 'Badminton'),
+        ('basketball', 'Basketbol'),
+        ('general', 'Ümumi')
+    ], string="İdman Növü", required=True, readonly=True)
+    amount = fields.Float(string="Məbləğ", readonly=True)
+    count = fields.Integer(string="Əməliyyat Sayı", readonly=True)
+
+    def init(self):
+        # Quraşdırma/yeniləmə zamanı kubu tam qur
+        self._rebuild_months(None)
+
+    # ---------- refresh ----------
+    @api.model
+    def _mark_months_dirty(self, dates):
+        """Ayları tranzaksiyanın sonunda yenilənmə növbəsinə yaz"""
+        months = {date.replace(day=1) for date in dates if date}
+        if not months:
+            return
+        precommit = self.env.cr.precommit
+        if CUBE_PENDING_KEY not in precommit.data:
+            precommit.data[CUBE_PENDING_KEY] = set()
+            precommit.add(self._enqueue_pending_months)
+        precommit.data[CUBE_PENDING_KEY].update(months)
+
+    def _enqueue_pending_months(self):
+        months = self.env.cr.precommit.data.pop(CUBE_PENDING_KEY, set())
+        if months:
+            # Unikal açar yoxdur: paralel tranzaksiyalar bir-birini gözləmir
+            self.env['volan.cash.revenue.cube.dirty.genclik'].sudo()._enqueue(sorted(months))
+
+    @api.model
+    def _cron_refresh_dirty_months(self):
+        """Növbədəki ayları yenidən hesabla və yalnız oxunan növbə sətirlərini sil.
+
+        Bu cron işləyərkən commit olunan yeni dəyişikliklər növbədə qalır və
+        növbəti işləmədə nəzərə alınır.
+        """
+        queue = self.env['volan.cash.revenue.cube.dirty.genclik'].sudo()
+        entries = queue._read_pending()
+        if not entries:
+            return
+        self._rebuild_months(sorted(set(entries.values())))
+        queue._dequeue(list(entries))
+
+    @api.model
+    def _rebuild_months(self, months):
+        """Verilmiş ayları (None - bütün tarixi) mənbə cədvəllərdən yenidən hesabla"""
+        self.env['volan.cash.ledger.snapshot.genclik']._flush_ledger_sources()
+        if months is None:
+            self.env.cr.execute("DELETE FROM volan_cash_revenue_cube_genclik")
+            month_filter = ""
+        else:
+            self.env.cr.execute("""
+                DELETE FROM volan_cash_revenue_cube_genclik WHERE month = ANY(%(months)s)
+            """, {'months': months})
+            # Əvvəlcə aralığa görə süz (gün ifadələrinin indeksləri), sonra dəqiq aylara görə
+            month_filter = """
+               AND day >= %(first)s AND day < %(last)s
+               AND date_trunc('month', day)::date = ANY(%(months)s)
+            """
+        self.env.cr.execute(f"""
+            INSERT INTO volan_cash_revenue_cube_genclik
+                   (month, category, payment_method, sport_type, amount, count,
+                    create_uid, create_date, write_uid, write_date)
+            SELECT date_trunc('month', day)::date, category, payment_method, sport_type,
+                   SUM(amount), COUNT(*),
+                   %(uid)s, NOW() AT TIME ZONE 'UTC', %(uid)s, NOW() AT TIME ZONE 'UTC'
+              FROM ({LEDGER_MOVES_SQL}) moves
+             WHERE day IS NOT NULL {month_filter}
+          GROUP BY 1, 2, 3, 4
+        """, {
+            'uid': self.env.uid,
+            'months': months,
+            'first': months and months[0],
+            'last': months and months[-1] + relativedelta(months=1),
+        })
+        self.invalidate_model()
+        _logger.debug("Revenue cube rebuilt for %s.", months or 'all months')
+
+    # ---------- API ----------
+    @api.model
+    def get_revenue_trend(self, months=24, sport_type='badminton', end_month=None):
+        """Son N ayın kateqoriyalar üzrə gəlir trendi.
+
+        Hər ay üçün {'month': 'YYYY-MM', 'lesson': .., 'sale': .., 'other': ..,
+        'expense': .., 'total': ..} qaytarır; əməliyyat olmayan aylar 0 ilə gəlir.
+        """
+        end = fields.Date.to_date(end_month or fields.Date.context_today(self)).replace(day=1)
+        start = end - relativedelta(months=months - 1)
+        groups = self._read_group(
+            [('month', '>=', start), ('month', '<=', end), ('sport_type', '=', sport_type)],
+            ['month:month', 'category'], ['amount:sum'])
+        amounts = {(month, category): amount for month, category, amount in groups}
+
+        trend = []
+        for index in range(months):
+            month = start + relativedelta(months=index)
+            row = {'month': month.strftime('%Y-%m')}
+            for category in CUBE_CATEGORIES:
+                row[category] = amounts.get((month, category), 0.0)
+            row['total'] = sum(row[category] for category in CUBE_CATEGORIES)
+            trend.append(row)
+        return trend
+
+
+class CashRevenueCubeDirty(models.Model):
+    """Yenidən hesablanmalı ayların növbəsi (yalnız əlavə olunur, cron oxuyub silir)"""
+    _name = 'volan.cash.revenue.cube.dirty.genclik'
+    _description = 'Gəlir Kubu Yenilənmə Növbəsi'
+    _log_access = False
+
+    month = fields.Date(string="Ay", required=True, readonly=True)
+
+    @api.model
+    def _enqueue(self, months):
+        self.env.cr.execute(
+            "INSERT INTO volan_cash_revenue_cube_dirty_genclik (month) SELECT unnest(%s::date[])",
+            (months,))
+
+    @api.model
+    def _read_pending(self):
+        """{növbə id: ay}"""
+        self.env.cr.execute("SELECT id, month FROM volan_cash_revenue_cube_dirty_genclik")
+        return dict(self.env.cr.fetchall())
+
+    @api.model
+    def _dequeue(self, ids):
+        self.env.cr.execute("DELETE FROM volan_cash_revenue_cube_dirty_genclik WHERE id = ANY(%s)", (ids,))
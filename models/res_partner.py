@@ -69,6 +69,12 @@ class VolanPartner(models.Model):
     # 7. Məşqçi bayrağı
     is_coach = fields.Boolean(string="Məşqçidir", default=False, help="İşçinin məşqçi olub olmadığını göstərir")
 
+    # 8. Abunəliklər və ilk abunəlik tarixi (yeni müştəri hesabatı üçün)
+    badminton_lesson_ids = fields.One2many('badminton.lesson.simple.genclik', 'partner_id', string="Abunəliklər")
+    first_lesson_date = fields.Date(string="İlk Abunəlik Tarixi", compute='_compute_first_lesson_date',
+                                    store=True, index=True,
+                                    help="Müştərinin ən erkən abunəliyinin başlama tarixi")
+
     @api.depends('birth_date')
     def _compute_age(self):
         """Müştərinin doğum tarixindən yaşını hesablayır"""
@@ -81,6 +87,17 @@ class VolanPartner(models.Model):
             else:
                 partner.age = 0
 
+    @api.depends('badminton_lesson_ids.payment_date')
+    def _compute_first_lesson_date(self):
+        """Bütün müştərilər üçün ən erkən başlama tarixini bir sorğu ilə tap"""
+        first_dates = {
+            partner.id: first_date
+            for partner, first_date in self.env['badminton.lesson.simple.genclik']._read_group(
+                [('partner_id', 'in', self._origin.ids)], ['partner_id'], ['payment_date:min'])
+        }
+        for partner in self:
+            partner.first_lesson_date = first_dates.get(partner._origin.id, False)
+
     @api.depends('name', 'write_date')
     def _compute_qr_code(self):
         """Her müşteri üçün unikal ID və adına əsaslanan bir QR kod yaradır."""